@@ -0,0 +1,70 @@
+"""Lookup table for the unique answers of a domain."""
+
+import json
+import os
+from functools import lru_cache
+
+import numpy
+
+
+def answer_key(title: str, qualifiers: list[str] | tuple[str, ...]) -> tuple[str, tuple[str, ...]]:
+    """Normalise a title and its qualifiers into the key used for looking up answers."""
+    return (title, tuple(qualifiers))
+
+
+class AnswerCatalogue:
+    """Hash-indexed catalogue of the unique answers for a domain.
+
+    Answers can be looked up either by their normalised (title, qualifiers) key or by their title alone. The
+    `exists`, `exists_with_qualifier`, and `popularity` values are stored as arrays indexed by the answer's position
+    in the catalogue. For title-only lookups, `title_first` holds the position of the first answer with that title and
+    `title_exists` whether any answer with that title exists.
+    """
+
+    def __init__(self, answers: list[dict]):
+        """Build the catalogue indices from the list of unique answers."""
+        self._answer_index = {}
+        self._title_index = {}
+        title_ids = []
+        title_first = []
+        for idx, answer in enumerate(answers):
+            key = answer_key(answer["answer"][0], answer["answer"][1])
+            self._answer_index.setdefault(key, idx)
+            title_id = self._title_index.setdefault(key[0], len(self._title_index))
+            if title_id == len(title_first):
+                title_first.append(idx)
+            title_ids.append(title_id)
+        self.exists = numpy.array([answer["exists"] for answer in answers], dtype=bool)
+        self.exists_with_qualifier = numpy.array([answer["exists_with_qualifier"] for answer in answers], dtype=bool)
+        self.popularity = numpy.array([answer["popularity"] for answer in answers], dtype=numpy.float64)
+        self.title_first = numpy.array(title_first, dtype=numpy.intp)
+        self.title_exists = numpy.zeros(len(title_first), dtype=bool)
+        numpy.logical_or.at(self.title_exists, numpy.array(title_ids, dtype=numpy.intp), self.exists)
+
+    def lookup(self, title: str, qualifiers: list[str] | tuple[str, ...]) -> int:
+        """Return the position of the answer with the given title and qualifiers or -1 if it is not in the catalogue."""
+        return self._answer_index.get(answer_key(title, qualifiers), -1)
+
+    def lookup_title(self, title: str) -> int:
+        """Return the identifier of the title or -1 if no answer with that title is in the catalogue."""
+        return self._title_index.get(title, -1)
+
+    def lookup_titles(self, titles: list[str]) -> numpy.ndarray:
+        """Return an array with the identifiers of all titles, using -1 for titles that are not in the catalogue."""
+        return numpy.array([self._title_index.get(title, -1) for title in titles], dtype=numpy.intp)
+
+
+@lru_cache(maxsize=8)
+def _load_catalogue(path: str, mtime_ns: int) -> AnswerCatalogue:  # noqa: ARG001
+    """Load and index the unique answers file. The `mtime_ns` is only used to invalidate the cache."""
+    with open(path) as in_f:
+        return AnswerCatalogue(json.load(in_f))
+
+
+def load_answer_catalogue(domain: str) -> AnswerCatalogue:
+    """Load the :class:`AnswerCatalogue` for a domain.
+
+    The catalogue is only built once per domain and is rebuilt if the unique answers file has changed.
+    """
+    path = os.path.join("data", domain, "unique-answers.json")
+    return _load_catalogue(path, os.stat(path).st_mtime_ns)
@@ -1,14 +1,13 @@
 """Correlation analysis."""
 
-import json
-import os
-
 import numpy
 from scipy.stats import kendalltau, pearsonr, spearmanr
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import StratifiedKFold, cross_val_score
 
-from llm_complex_leisure_search.constants import DATA_SETS
+from llm_complex_leisure_search.analysis.catalogue import load_answer_catalogue
+from llm_complex_leisure_search.analysis.data import load_tasks
+from llm_complex_leisure_search.analysis.results import load_results
 
 
 class BinaryEqualSplitter:
@@ -48,33 +47,15 @@ class BinaryEqualSplitter:
 
 def correlate_correct(domain: str, llm: str) -> dict:
     """Calculate logistics regressions for confidence and rank to success."""
-    solved = []
-    solutions = []
-    for data_set in DATA_SETS:
-        with open(os.path.join("data", domain, f"solved_{data_set}.json")) as in_f:
-            solved = solved + json.load(in_f)
-        with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-            solutions = solutions + json.load(in_f)
-    confidence = [[], []]
-    rank = [[], []]
-    combined = [[], []]
-    for task in solved:
-        for solution in solutions:
-            if task["thread_id"] == solution["thread_id"]:
-                for result_list in solution["results"]:
-                    for idx, entry in enumerate(result_list):
-                        if "normalised_confidence" in entry:
-                            confidence[0].append([entry["normalised_confidence"]])
-                            rank[0].append([idx])
-                            combined[0].append([entry["normalised_confidence"], idx])
-                            if task["title"] == entry["title"]:
-                                confidence[1].append(True)
-                                rank[1].append(True)
-                                combined[1].append(True)
-                            else:
-                                confidence[1].append(False)
-                                rank[1].append(False)
-                                combined[1].append(False)
+    solved = load_tasks(domain)
+    results = load_results(domain, llm)
+    _, _, entries, correct = results.match_tasks(solved)
+    has_confidence = ~numpy.isnan(results.entry_confidence[entries])
+    entries = entries[has_confidence]
+    correct = correct[has_confidence]
+    confidence = [results.entry_confidence[entries].reshape((-1, 1)), correct]
+    rank = [results.entry_rank[entries].reshape((-1, 1)), correct]
+    combined = [numpy.stack([results.entry_confidence[entries], results.entry_rank[entries]], axis=1), correct]
 
     splitter = BinaryEqualSplitter(n_splits=20)
     splitter_positive = BinaryEqualSplitter(n_splits=20, test="positive")
@@ -123,18 +104,10 @@ def correlate_correct(domain: str, llm: str) -> dict:
 
 def correlate_confidence_rank(domain: str, llm: str) -> dict:
     """Calculate correlation between confidence and rank."""
-    solutions = []
-    for data_set in DATA_SETS:
-        with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-            solutions = solutions + json.load(in_f)
-    confidences = []
-    ranks = []
-    for solution in solutions:
-        for result_list in solution["results"]:
-            for idx, result in enumerate(result_list):
-                if "normalised_confidence" in result:
-                    confidences.append(result["normalised_confidence"])
-                    ranks.append(idx)
+    results = load_results(domain, llm)
+    has_confidence = ~numpy.isnan(results.entry_confidence)
+    confidences = results.entry_confidence[has_confidence]
+    ranks = results.entry_rank[has_confidence]
     pearson_corr = pearsonr(confidences, ranks)
     spearman_corr = spearmanr(confidences, ranks)
     kendall_corr = kendalltau(confidences, ranks)
@@ -150,25 +123,12 @@ def correlate_confidence_rank(domain: str, llm: str) -> dict:
 
 def correlate_popularity_rank(domain: str, llm: str) -> dict:
     """Calculate correlation between popularity of the answer and rank."""
-    solutions = []
-    for data_set in DATA_SETS:
-        with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-            solutions = solutions + json.load(in_f)
-    with open(os.path.join("data", domain, "unique-answers.json")) as in_f:
-        answers = json.load(in_f)
-    popularities = []
-    ranks = []
-    for solution in solutions:
-        for result_list in solution["results"]:
-            for idx, result in enumerate(result_list):
-                found = None
-                for answer in answers:
-                    if answer["answer"][0] == result["title"]:
-                        found = answer
-                        break
-                if found is not None:
-                    popularities.append(found["popularity"])
-                    ranks.append(idx)
+    results = load_results(domain, llm)
+    catalogue = load_answer_catalogue(domain)
+    title_ids = catalogue.lookup_titles(results.strings)[results.entry_title]
+    found = title_ids >= 0
+    popularities = catalogue.popularity[catalogue.title_first[title_ids[found]]]
+    ranks = results.entry_rank[found]
     pearson_corr = pearsonr(popularities, ranks)
     spearman_corr = spearmanr(popularities, ranks)
     kendall_corr = kendalltau(popularities, ranks)
@@ -184,25 +144,12 @@ def correlate_popularity_rank(domain: str, llm: str) -> dict:
 
 def correlate_popularity_confidence(domain: str, llm: str) -> dict:
     """Calculate correlation between popularity of the answer and confidence."""
-    solutions = []
-    for data_set in DATA_SETS:
-        with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-            solutions = solutions + json.load(in_f)
-    with open(os.path.join("data", domain, "unique-answers.json")) as in_f:
-        answers = json.load(in_f)
-    popularities = []
-    ranks = []
-    for solution in solutions:
-        for result_list in solution["results"]:
-            for result in result_list:
-                found = None
-                for answer in answers:
-                    if answer["answer"][0] == result["title"]:
-                        found = answer
-                        break
-                if found is not None and "normalised_confidence" in result:
-                    popularities.append(found["popularity"])
-                    ranks.append(result["normalised_confidence"])
+    results = load_results(domain, llm)
+    catalogue = load_answer_catalogue(domain)
+    title_ids = catalogue.lookup_titles(results.strings)[results.entry_title]
+    found = (title_ids >= 0) & ~numpy.isnan(results.entry_confidence)
+    popularities = catalogue.popularity[catalogue.title_first[title_ids[found]]]
+    ranks = results.entry_confidence[found]
     pearson_corr = pearsonr(popularities, ranks)
     spearman_corr = spearmanr(popularities, ranks)
     kendall_corr = kendalltau(popularities, ranks)
@@ -0,0 +1,15 @@
+"""Data loading for the analysis modules."""
+
+import json
+import os
+
+from llm_complex_leisure_search.constants import DATA_SETS
+
+
+def load_tasks(domain: str) -> list[dict]:
+    """Load the solved tasks across all data-sets of a domain."""
+    tasks = []
+    for data_set in DATA_SETS:
+        with open(os.path.join("data", domain, f"solved_{data_set}.json")) as in_f:
+            tasks.extend(json.load(in_f))
+    return tasks
@@ -0,0 +1,91 @@
+"""Rank-based evaluation of the LLM results."""
+
+from collections import Counter
+
+import numpy
+
+from llm_complex_leisure_search.analysis.data import load_tasks
+from llm_complex_leisure_search.analysis.results import ResultTable, load_results
+
+RUN_COUNT = 3
+NO_HIT = numpy.iinfo(numpy.int32).max
+
+
+def solved_mmr(data: dict, task_count: int, solved_factor: int = 1, field_suffix: str = "") -> dict:
+    """Calculate the MMR from the solved at rank counts in `data`."""
+    total = 0
+    for rank in range(1, 21):
+        if rank > 1:
+            total = total + (
+                1 / rank * (data[f"solved.{rank}{field_suffix}"] - data[f"solved.{rank - 1}{field_suffix}"])
+            )
+        else:
+            total = total + (1 / rank * data[f"solved.{rank}{field_suffix}"])
+    return {"mmr": total / (task_count * solved_factor)}
+
+
+class RankEvaluation:
+    """The first-hit ranks of all (thread, run) pairs for one LLM.
+
+    The tasks are joined to the results via a thread_id index and for every run the rank of the first entry that
+    matches the task's title is stored in a single (thread, run) array. Runs without a matching entry, as well as
+    missing runs, are set to :data:`NO_HIT`. All solved at rank statistics are then derived from that array.
+    """
+
+    def __init__(self, tasks: list[dict], results: ResultTable):
+        """Initialise the evaluation by joining the tasks to the results."""
+        pair_count, pairs, entries, hits = results.match_tasks(tasks)
+        run_count = max(RUN_COUNT, int(results.run_index.max(initial=-1)) + 1)
+        self.task_count = len(tasks)
+        self.ranks = numpy.full((pair_count, run_count), NO_HIT, dtype=numpy.int32)
+        numpy.minimum.at(
+            self.ranks,
+            (pairs[hits], results.run_index[results.entry_run[entries[hits]]]),
+            results.entry_rank[entries[hits]],
+        )
+
+    def solved_at_rank(self, rank: int) -> dict:
+        """Calculate how many solved tasks at a given rank in any one of the result lists."""
+        total_found = int(numpy.count_nonzero(self.ranks.min(axis=1, initial=NO_HIT) <= rank))
+        return {f"solved.{rank + 1}": total_found, f"solved.{rank + 1}.fraction": total_found / self.task_count}
+
+    def solved_at_rank_single(self, rank: int) -> dict:
+        """Calculate how many solved tasks at a given rank in each of the result lists."""
+        total_found = int(numpy.count_nonzero(self.ranks <= rank))
+        return {
+            f"solved.{rank + 1}": total_found,
+            f"solved.{rank + 1}.fraction": total_found / (self.task_count * RUN_COUNT),
+        }
+
+    def solved_at_rank_avg(self, rank: int) -> dict:
+        """Calculate how many solved tasks at a given rank as an average of the runs."""
+        totals = numpy.count_nonzero(self.ranks[:, :RUN_COUNT] <= rank, axis=0)
+        totals_frac = totals / self.task_count
+        return {
+            f"solved.{rank + 1}.avg": numpy.average(totals),
+            f"solved.{rank + 1}.stdev": numpy.std(totals),
+            f"solved.{rank + 1}.fraction.avg": numpy.average(totals_frac),
+            f"solved.{rank + 1}.fraction.stdev": numpy.std(totals_frac),
+        }
+
+    def solved_stats(self) -> dict:
+        """Calculate statistics of how many solved across all result lists."""
+        counts = Counter(numpy.count_nonzero(self.ranks != NO_HIT, axis=1).tolist())
+        result = {f"solved.{count}": counts[count] for count in range(0, RUN_COUNT + 1)}
+        for count in range(0, RUN_COUNT + 1):
+            result[f"solved.{count}.fraction"] = counts[count] / self.task_count
+        return result
+
+    def mmr(self, data: dict, solved_factor: int = 1, field_suffix: str = "") -> dict:
+        """Calculate the MMR for the solved at rank counts in `data`."""
+        return solved_mmr(data, self.task_count, solved_factor=solved_factor, field_suffix=field_suffix)
+
+
+def load_rank_evaluation(domain: str, llm: str, tasks: list[dict] | None = None) -> RankEvaluation:
+    """Load the :class:`RankEvaluation` for a domain and LLM.
+
+    If the `tasks` have already been loaded for the domain, they can be passed in to avoid reloading them.
+    """
+    if tasks is None:
+        tasks = load_tasks(domain)
+    return RankEvaluation(tasks, load_results(domain, llm))
@@ -0,0 +1,124 @@
+"""Parallel execution of analyses over the (domain, llm) matrix."""
+
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from csv import DictWriter
+from typing import Any
+
+from pydantic import ValidationError
+from rich import print as console
+from rich.progress import track
+
+from llm_complex_leisure_search.constants import DOMAINS, LLMS
+
+
+class Report:
+    """An analysis that is calculated for each (domain, llm) cell and written to one or more CSV files.
+
+    `outputs` maps the CSV filenames in the `analysis` folder to their fieldnames. The `cell` function is called with
+    the domain and llm and returns a dictionary that maps each filename to its row for that cell, without the `domain`
+    and `llm` columns. It must be a module-level function, so that it can be run in a worker process.
+
+    If a `domain_data` function is given, it is called once per domain in the main process and its result is passed
+    to the `cell` function as a third argument, so that data shared by all LLMs of a domain is only loaded once.
+    """
+
+    def __init__(
+        self,
+        outputs: dict[str, list[str]],
+        cell: Callable[..., dict[str, dict]],
+        domain_data: Callable[[str], Any] | None = None,
+    ):
+        """Initialise the report."""
+        self.outputs = outputs
+        self.cell = cell
+        self.domain_data = domain_data
+
+
+class SingleFileCell:
+    """Adapter for statistics functions that return a single row for a (domain, llm) cell."""
+
+    def __init__(self, filename: str, function: Callable[[str, str], dict]):
+        """Initialise the adapter."""
+        self.filename = filename
+        self.function = function
+
+    def __call__(self, domain: str, llm: str) -> dict[str, dict]:
+        """Calculate the row for the cell."""
+        return {self.filename: self.function(domain, llm)}
+
+
+def single_file_report(filename: str, fieldnames: list[str], function: Callable[[str, str], dict]) -> Report:
+    """Create a :class:`Report` for a statistics function that returns a single row per (domain, llm) cell."""
+    return Report({filename: ["domain", "llm", *fieldnames]}, SingleFileCell(filename, function))
+
+
+def _capture_errors(label: str, function: Callable[..., Any], *args: Any) -> tuple[Any, str]:
+    """Call the function, returning its result and an error message if it raised an exception.
+
+    Missing and invalid data get a short message, any other exception is reported with its type, so that a failing
+    cell does not abort the other cells.
+    """
+    try:
+        return (function(*args), None)
+    except KeyError as e:
+        return (None, f"{e} not found")
+    except FileNotFoundError as e:
+        return (None, str(e))
+    except ValidationError as e:
+        return (None, f"{label}: invalid result file ({e.error_count()} errors)")
+    except Exception as e:
+        return (None, f"{label}: {type(e).__name__}: {e}")
+
+
+def _run_cell(cell: Callable[..., dict[str, dict]], domain: str, llm: str, *args: Any) -> tuple[dict[str, dict], str]:
+    """Run a single cell in a worker process, returning its rows and an error message."""
+    rows, error = _capture_errors(f"{domain} {llm}", cell, domain, llm, *args)
+    return (rows if error is None else {}, error)
+
+
+def run_reports(reports: list[Report], description: str) -> None:
+    """Calculate all cells of the `reports` in a process pool and write the CSV files.
+
+    All cells of all reports are scheduled together. The rows are written once all cells have been calculated, in
+    the order of :data:`DOMAINS` and :data:`LLMS`, so that the output does not depend on the scheduling. The
+    reports' `domain_data` is loaded in the main process before the cells are scheduled.
+    """
+    results = {}
+    cells = {}
+    for report_idx, report in enumerate(reports):
+        for domain in DOMAINS:
+            args = ()
+            if report.domain_data is not None:
+                domain_data, error = _capture_errors(domain, report.domain_data, domain)
+                if error is not None:
+                    for llm in LLMS:
+                        results[(report_idx, domain, llm)] = ({}, error)
+                    continue
+                args = (domain_data,)
+            for llm in LLMS:
+                cells[(report_idx, domain, llm)] = args
+    with ProcessPoolExecutor() as executor:
+        futures = {
+            executor.submit(_run_cell, reports[report_idx].cell, domain, llm, *args): (report_idx, domain, llm)
+            for (report_idx, domain, llm), args in cells.items()
+        }
+        for future in track(as_completed(futures), total=len(futures), description=description):
+            results[futures[future]] = future.result()
+    for report_idx, report in enumerate(reports):
+        with ExitStack() as stack:
+            writers = {}
+            for filename, fieldnames in report.outputs.items():
+                writers[filename] = DictWriter(
+                    stack.enter_context(open(os.path.join("analysis", filename), "w")), fieldnames=fieldnames
+                )
+                writers[filename].writeheader()
+            for domain in DOMAINS:
+                for llm in LLMS:
+                    rows, error = results[(report_idx, domain, llm)]
+                    if error is not None:
+                        console(error)
+                    for filename, row in rows.items():
+                        writers[filename].writerow({"domain": domain, "llm": llm, **row})
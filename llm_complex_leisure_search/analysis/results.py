@@ -0,0 +1,308 @@
+"""Columnar cache of the LLM result files.
+
+Each ``data/<domain>/<llm>_<data_set>.json`` file is converted on first read into a set of typed NumPy arrays, which
+are stored in ``data/<domain>/.cache/<llm>_<data_set>/`` and memory-mapped on subsequent reads. All strings (titles
+and qualifiers) are interned into a single string table. The cache is rebuilt whenever the source file's content
+changes. Reads and writes of a cache directory are serialised with a file lock next to it, so that concurrent worker
+processes never see a partially replaced cache.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import numpy
+
+from llm_complex_leisure_search.constants import DATA_SETS
+from llm_complex_leisure_search.models import Thread, load_threads
+from llm_complex_leisure_search.util import file_digest
+
+CACHE_VERSION = 1
+ARRAY_FIELDS = (
+    "entry_thread",
+    "entry_run",
+    "entry_rank",
+    "entry_title",
+    "entry_answer",
+    "entry_confidence",
+    "run_thread",
+    "run_index",
+    "run_length",
+    "answer_title",
+    "answer_qualifier_offsets",
+    "answer_qualifiers",
+)
+
+
+class ResultTable:
+    """Columnar representation of the results generated by one LLM.
+
+    The ``entry_*`` arrays hold one value per generated entry: the thread and (global) run it belongs to, its rank in
+    the run, its title and answer identifiers, and its normalised confidence (NaN if there is none). The ``run_*``
+    arrays hold the thread, the index within the thread, and the length of each run. The ``answer_*`` arrays map each
+    unique (title, qualifiers) answer to its title and qualifier string identifiers.
+    """
+
+    def __init__(self, strings: list, thread_ids: list[str], arrays: dict[str, numpy.ndarray]):
+        """Initialise the table from its string tables and arrays."""
+        self.strings = strings
+        self.thread_ids = thread_ids
+        for field in ARRAY_FIELDS:
+            setattr(self, field, arrays[field])
+        self._string_index = None
+        self._thread_index = None
+
+    def string_id(self, value: str | None) -> int:
+        """Return the identifier of an interned string or -1 if it does not occur in the table."""
+        if self._string_index is None:
+            self._string_index = {value: idx for idx, value in enumerate(self.strings)}
+        return self._string_index.get(value, -1)
+
+    def thread_rows(self, thread_id: str) -> list[int]:
+        """Return the row indices of all threads with the given thread_id."""
+        if self._thread_index is None:
+            self._thread_index = {}
+            for idx, value in enumerate(self.thread_ids):
+                self._thread_index.setdefault(value, []).append(idx)
+        return self._thread_index.get(thread_id, [])
+
+    def entry_indices(self, rows: list[int]) -> tuple[numpy.ndarray, numpy.ndarray]:
+        """Expand thread rows into the indices of their entries.
+
+        Returns a tuple of two arrays. The first holds for each entry the position of its row in `rows`, the second
+        holds the entry's index.
+        """
+        rows = numpy.array(rows, dtype=numpy.int32)
+        starts = numpy.searchsorted(self.entry_thread, rows, side="left")
+        lengths = numpy.searchsorted(self.entry_thread, rows, side="right") - starts
+        row_positions = numpy.repeat(numpy.arange(len(rows)), lengths)
+        offsets = numpy.repeat(starts - (numpy.cumsum(lengths) - lengths), lengths)
+        return row_positions, numpy.arange(len(row_positions)) + offsets
+
+    def match_tasks(self, tasks: list[dict]) -> tuple[int, numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+        """Join the tasks to the threads and match the entries against the tasks' titles.
+
+        Returns the number of (task, thread) pairs and three arrays with one value per entry of the joined threads: the
+        pair the entry belongs to, the entry's index, and whether the entry's title matches the task's title.
+        """
+        titles = []
+        rows = []
+        for task in tasks:
+            for row in self.thread_rows(task["thread_id"]):
+                titles.append(self.string_id(task["title"]))
+                rows.append(row)
+        pairs, entries = self.entry_indices(rows)
+        hits = self.entry_title[entries] == numpy.array(titles, dtype=numpy.int32)[pairs]
+        return len(rows), pairs, entries, hits
+
+    def answer(self, answer_id: int) -> tuple[str, tuple[str, ...]]:
+        """Return the (title, qualifiers) tuple of an answer."""
+        start, end = self.answer_qualifier_offsets[answer_id], self.answer_qualifier_offsets[answer_id + 1]
+        return (
+            self.strings[self.answer_title[answer_id]],
+            tuple(self.strings[idx] for idx in self.answer_qualifiers[start:end]),
+        )
+
+    def unique_answers(self) -> list[tuple[str, tuple[str, ...]]]:
+        """Return the (title, qualifiers) tuples of all unique answers in the table."""
+        offsets = self.answer_qualifier_offsets.tolist()
+        qualifiers = [self.strings[idx] for idx in self.answer_qualifiers.tolist()]
+        return [
+            (self.strings[title], tuple(qualifiers[offsets[idx] : offsets[idx + 1]]))
+            for idx, title in enumerate(self.answer_title.tolist())
+        ]
+
+    def arrays(self) -> dict[str, numpy.ndarray]:
+        """Return all arrays of the table."""
+        return {field: getattr(self, field) for field in ARRAY_FIELDS}
+
+    @classmethod
+    def from_threads(cls, threads: list[Thread]) -> "ResultTable":
+        """Build the table from the threads loaded from a result file."""
+        strings = {}
+        answers = {}
+        answer_titles = []
+        answer_qualifiers = []
+        answer_qualifier_offsets = [0]
+        entries = {field: [] for field in ("thread", "run", "rank", "title", "answer", "confidence")}
+        runs = {field: [] for field in ("thread", "index", "length")}
+        for thread_idx, thread in enumerate(threads):
+            for run_idx, result_list in enumerate(thread.results):
+                run = len(runs["thread"])
+                runs["thread"].append(thread_idx)
+                runs["index"].append(run_idx)
+                runs["length"].append(len(result_list))
+                for rank, entry in enumerate(result_list):
+                    title = strings.setdefault(entry.title, len(strings))
+                    qualifiers = tuple(strings.setdefault(value, len(strings)) for value in entry.qualifiers)
+                    answer = answers.get((title, qualifiers))
+                    if answer is None:
+                        answer = len(answers)
+                        answers[(title, qualifiers)] = answer
+                        answer_titles.append(title)
+                        answer_qualifiers.extend(qualifiers)
+                        answer_qualifier_offsets.append(len(answer_qualifiers))
+                    entries["thread"].append(thread_idx)
+                    entries["run"].append(run)
+                    entries["rank"].append(rank)
+                    entries["title"].append(title)
+                    entries["answer"].append(answer)
+                    entries["confidence"].append(
+                        numpy.nan if entry.normalised_confidence is None else entry.normalised_confidence
+                    )
+        arrays = {
+            "entry_thread": numpy.array(entries["thread"], dtype=numpy.int32),
+            "entry_run": numpy.array(entries["run"], dtype=numpy.int32),
+            "entry_rank": numpy.array(entries["rank"], dtype=numpy.int32),
+            "entry_title": numpy.array(entries["title"], dtype=numpy.int32),
+            "entry_answer": numpy.array(entries["answer"], dtype=numpy.int32),
+            "entry_confidence": numpy.array(entries["confidence"], dtype=numpy.float64),
+            "run_thread": numpy.array(runs["thread"], dtype=numpy.int32),
+            "run_index": numpy.array(runs["index"], dtype=numpy.int32),
+            "run_length": numpy.array(runs["length"], dtype=numpy.int32),
+            "answer_title": numpy.array(answer_titles, dtype=numpy.int32),
+            "answer_qualifier_offsets": numpy.array(answer_qualifier_offsets, dtype=numpy.int64),
+            "answer_qualifiers": numpy.array(answer_qualifiers, dtype=numpy.int32),
+        }
+        return cls(list(strings), [thread.thread_id for thread in threads], arrays)
+
+    @classmethod
+    def concatenate(cls, tables: list["ResultTable"]) -> "ResultTable":
+        """Concatenate multiple tables, merging their string tables.
+
+        Identical answers from different tables are kept as separate answer identifiers.
+        """
+        if len(tables) == 1:
+            return tables[0]
+        strings = {}
+        thread_ids = []
+        parts = {field: [] for field in ARRAY_FIELDS}
+        thread_offset = 0
+        run_offset = 0
+        answer_offset = 0
+        qualifier_offset = 0
+        for table in tables:
+            string_map = numpy.array(
+                [strings.setdefault(value, len(strings)) for value in table.strings], dtype=numpy.int32
+            )
+            parts["entry_thread"].append(table.entry_thread + thread_offset)
+            parts["entry_run"].append(table.entry_run + run_offset)
+            parts["entry_rank"].append(table.entry_rank)
+            parts["entry_title"].append(string_map[table.entry_title])
+            parts["entry_answer"].append(table.entry_answer + answer_offset)
+            parts["entry_confidence"].append(table.entry_confidence)
+            parts["run_thread"].append(table.run_thread + thread_offset)
+            parts["run_index"].append(table.run_index)
+            parts["run_length"].append(table.run_length)
+            parts["answer_title"].append(string_map[table.answer_title])
+            parts["answer_qualifier_offsets"].append(table.answer_qualifier_offsets[:-1] + qualifier_offset)
+            parts["answer_qualifiers"].append(string_map[table.answer_qualifiers])
+            thread_ids.extend(table.thread_ids)
+            thread_offset += len(table.thread_ids)
+            run_offset += len(table.run_thread)
+            answer_offset += len(table.answer_title)
+            qualifier_offset += len(table.answer_qualifiers)
+        parts["answer_qualifier_offsets"].append(numpy.array([qualifier_offset], dtype=numpy.int64))
+        arrays = {field: numpy.concatenate(values) for field, values in parts.items()}
+        return cls(list(strings), thread_ids, arrays)
+
+
+def cache_path(path: str) -> str:
+    """Return the cache directory for a result file."""
+    return os.path.join(os.path.dirname(path), ".cache", os.path.splitext(os.path.basename(path))[0])
+
+
+@contextmanager
+def _cache_lock(target: str, *, exclusive: bool) -> Iterator[None]:
+    """Hold a shared (reading) or exclusive (writing) lock on the cache directory `target`."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(f"{target}.lock", "a") as lock_f:
+        fcntl.flock(lock_f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+
+
+def _write_cache(path: str, table: ResultTable, source_stat: os.stat_result, digest: str) -> None:
+    """Write the table into the cache directory.
+
+    The cache is written into a temporary directory first, which then replaces any existing cache directory while
+    holding the exclusive cache lock.
+    """
+    target = cache_path(path)
+    tmp_target = f"{target}.{os.getpid()}.tmp"
+    os.makedirs(tmp_target)
+    for field, array in table.arrays().items():
+        numpy.save(os.path.join(tmp_target, f"{field}.npy"), array)
+    with open(os.path.join(tmp_target, "strings.json"), "w") as out_f:
+        json.dump({"strings": table.strings, "thread_ids": table.thread_ids}, out_f)
+    _write_metadata(tmp_target, source_stat, digest)
+    with _cache_lock(target, exclusive=True):
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.rename(tmp_target, target)
+
+
+def _write_metadata(target: str, source_stat: os.stat_result, digest: str) -> None:
+    """Write the cache metadata."""
+    with open(os.path.join(target, "meta.json"), "w") as out_f:
+        json.dump(
+            {
+                "version": CACHE_VERSION,
+                "mtime_ns": source_stat.st_mtime_ns,
+                "size": source_stat.st_size,
+                "sha256": digest,
+            },
+            out_f,
+        )
+
+
+def _read_cache(target: str) -> ResultTable:
+    """Read the table from the cache directory, memory-mapping all arrays."""
+    with open(os.path.join(target, "strings.json")) as in_f:
+        string_tables = json.load(in_f)
+    arrays = {
+        field: numpy.load(os.path.join(target, f"{field}.npy"), mmap_mode="r", allow_pickle=False)
+        for field in ARRAY_FIELDS
+    }
+    return ResultTable(string_tables["strings"], string_tables["thread_ids"], arrays)
+
+
+def load_result_file(path: str) -> ResultTable:
+    """Load a single result file via the columnar cache.
+
+    The cache is used if the source file's mtime and size are unchanged. If they have changed, but the content digest
+    is unchanged, only the cache metadata is updated. Otherwise the cache is rebuilt from the source file.
+    """
+    source_stat = os.stat(path)
+    target = cache_path(path)
+    metadata = None
+    with _cache_lock(target, exclusive=False):
+        if os.path.exists(os.path.join(target, "meta.json")):
+            with open(os.path.join(target, "meta.json")) as in_f:
+                metadata = json.load(in_f)
+            if metadata.get("version") != CACHE_VERSION:
+                metadata = None
+        if (
+            metadata is not None
+            and metadata["mtime_ns"] == source_stat.st_mtime_ns
+            and metadata["size"] == source_stat.st_size
+        ):
+            return _read_cache(target)
+    digest = file_digest(path)
+    if metadata is not None and metadata["sha256"] == digest:
+        with _cache_lock(target, exclusive=True):
+            if os.path.exists(os.path.join(target, "meta.json")):
+                _write_metadata(target, source_stat, digest)
+                return _read_cache(target)
+    table = ResultTable.from_threads(load_threads(path))
+    _write_cache(path, table, source_stat, digest)
+    return table
+
+
+def load_results(domain: str, llm: str) -> ResultTable:
+    """Load the results generated by an LLM across all data-sets of a domain."""
+    return ResultTable.concatenate(
+        [load_result_file(os.path.join("data", domain, f"{llm}_{data_set}.json")) for data_set in DATA_SETS]
+    )
@@ -1,7 +1,10 @@
 import re
 import urllib.parse
+from functools import partial
 
-import requests
+from httpx import Client
+
+from llm_complex_leisure_search.cache import response_cache
 
 BASE_URL = "https://openlibrary.org/search.json"
 
@@ -25,17 +28,61 @@ def extract_matches(response):
     return items
 
 
+def _fetch_openlibrary(url: str):
+    with Client(timeout=30) as client:
+        response = client.get(url)
+    if response.status_code == 200:
+        return response.json()
+    else:
+        return None
+
+
 def search_openlibrary(author: str, title: str):
     # url-encoded title and author
     title = re.sub(" +", "+", title)
     title = urllib.parse.quote_plus(title)
     author = urllib.parse.quote_plus(author)
     url = f"{BASE_URL}?title={title}&author={author}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
+    # responses are cached, failed requests are retried on the next call
+    return response_cache().cached("openlibrary.search", f"{title}&{author}", partial(_fetch_openlibrary, url))
+
+
+def _best_match(response):
+    """Return the first document of an OpenLibrary response if it contains exact matches."""
+    if response is None or response.get("numFound", 0) == 0 or not response.get("numFoundExact", False):
         return None
+    return response["docs"][0] if len(response["docs"]) > 0 else None
+
+
+def check_answer(answer: dict) -> dict:
+    """Check whether a book answer exists in OpenLibrary.
+
+    The answer exists with its qualifier if an exact match is found for the title and the answer's authors and exists
+    if an exact match is found for the title alone. The popularity is the reading-log count of the first match.
+    """
+    result = {
+        "exists": answer["exists"],
+        "exists_with_qualifier": answer["exists_with_qualifier"],
+        "popularity": answer["popularity"],
+    }
+    title = answer["answer"][0]
+    author_string = " ".join(answer["answer"][1])
+    match = None
+    if author_string:
+        match = _best_match(search_openlibrary(author_string, title))
+        if match is not None:
+            result["exists_with_qualifier"] = True
+    if match is None:
+        match = _best_match(search_openlibrary("", title))
+    if match is not None:
+        result["exists"] = True
+        result["popularity"] = match.get("readinglog_count", 0)
+    return result
+
+
+def check_answers(answers: list[dict]) -> list[dict]:
+    """Check whether the book answers exist in OpenLibrary."""
+    return [check_answer(answer) for answer in answers]
 
 
 def main():
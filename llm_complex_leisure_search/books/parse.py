@@ -1,9 +1,13 @@
+import csv
 import datetime
+import functools
 import glob
 import os
 import re
 import time
+from concurrent.futures import ProcessPoolExecutor
 
+import lxml.html
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
@@ -56,9 +60,14 @@ def get_relative_day_diff(time_string: str) -> datetime.timedelta:
     raise IndexError(f"time_string '{time_string}' is not in {RELATIVE_DAYS}")
 
 
-def parse_time_string(time_string: str, topic_file: str):
+def get_reference_timestamp(topic_file: str) -> datetime.datetime:
+    # the ctime of the saved topic file, at the one second resolution of time.ctime
+    return datetime.datetime.fromtimestamp(int(os.stat(topic_file).st_ctime))
+
+
+def parse_time_string_dateutil(time_string: str, reference_timestamp: datetime.datetime):
+    # the original prefix-check and dateutil based parser, kept as the reference for parse_time_string
     if is_relative_time_string(time_string):
-        reference_timestamp = parser.parse(time.ctime(os.stat(topic_file).st_ctime))
         if has_weekday(time_string):
             return reference_timestamp - get_weekday_diff(time_string, reference_timestamp)
         elif has_relative_day(time_string):
@@ -67,19 +76,114 @@ def parse_time_string(time_string: str, topic_file: str):
             full_time_string = f"{time_string} {reference_timestamp.year}"
             return parser.parse(full_time_string)
         else:
-            print(f'Unknown time_string format: "{time}"')
+            print(f'Unknown time_string format: "{time_string}"')
 
         return time_string
     else:
         return parser.parse(time_string)
 
 
-def extract_user_time(user_time_td, topic_file: str):
+# month names as accepted by dateutil
+MONTHS = {
+    name: idx + 1
+    for idx, names in enumerate(
+        [
+            ("Jan", "January"),
+            ("Feb", "February"),
+            ("Mar", "March"),
+            ("Apr", "April"),
+            ("May",),
+            ("Jun", "June"),
+            ("Jul", "July"),
+            ("Aug", "August"),
+            ("Sep", "Sept", "September"),
+            ("Oct", "October"),
+            ("Nov", "November"),
+            ("Dec", "December"),
+        ]
+    )
+    for name in names
+}
+
+# single dispatch over the LibraryThing time string formats, in the order in which the prefix checks were applied:
+# "Monday 8:40pm", "Yesterday 8:40pm", "January 10", and "Jan 10, 2021" with an optional "8:40pm" time
+TIME_STRING_PATTERN = re.compile(
+    r"(?P<weekday>Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday).*"
+    r"|(?P<relative_day>Today|Yesterday).*"
+    r"|(?P<no_year_month>[A-Z][a-z]+) (?P<no_year_day>\d{1,2})"
+    r"|(?P<month>[A-Z][a-z]+) (?P<day>\d{1,2}),? (?P<year>\d{4})"
+    r"(?:,? (?P<hour>\d{1,2}):(?P<minute>\d{2}) ?(?P<meridiem>[ap]m)?)?",
+    re.DOTALL,
+)
+
+
+def parse_absolute_time_string(match: re.Match):
+    # fast path for "Jan 10, 2021 8:40pm", returns None if the time string needs the general parser
+    month = MONTHS.get(match.group("month"))
+    if month is None:
+        return None
+    hour = int(match.group("hour")) if match.group("hour") is not None else 0
+    minute = int(match.group("minute")) if match.group("minute") is not None else 0
+    if match.group("meridiem") is not None:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match.group("meridiem") == "pm" else 0)
+    try:
+        return datetime.datetime(int(match.group("year")), month, int(match.group("day")), hour, minute)
+    except ValueError:
+        return None
+
+
+@functools.lru_cache(maxsize=65536)
+def classify_time_string(time_string: str):
+    # memoised per distinct time string: the kind of time string and the values needed to resolve it
+    match = TIME_STRING_PATTERN.fullmatch(time_string)
+    if match is not None:
+        if match.group("weekday") is not None:
+            return "weekday", WEEKDAYS.index(match.group("weekday"))
+        elif match.group("relative_day") is not None:
+            return "relative_day", RELATIVE_DAYS.index(match.group("relative_day"))
+        elif match.group("no_year_month") is not None:
+            return "no_year", (MONTHS.get(match.group("no_year_month")), int(match.group("no_year_day")))
+        else:
+            timestamp = parse_absolute_time_string(match)
+            if timestamp is not None:
+                return "absolute", timestamp
+    return "absolute", parser.parse(time_string)
+
+
+@functools.lru_cache(maxsize=65536)
+def resolve_relative_time_string(time_string: str, reference_timestamp: datetime.datetime):
+    # memoised per distinct time string and reference timestamp
+    kind, value = classify_time_string(time_string)
+    if kind == "weekday":
+        return reference_timestamp - datetime.timedelta(days=reference_timestamp.weekday() - value)
+    elif kind == "relative_day":
+        return reference_timestamp - datetime.timedelta(days=value)
+    month, day = value
+    if month is not None:
+        try:
+            return datetime.datetime(reference_timestamp.year, month, day)
+        except ValueError:
+            pass
+    return parser.parse(f"{time_string} {reference_timestamp.year}")
+
+
+def parse_time_string(time_string: str, topic_file: str, reference_timestamp: datetime.datetime | None = None):
+    kind, value = classify_time_string(time_string)
+    if kind == "absolute":
+        return value
+    if reference_timestamp is None:
+        reference_timestamp = get_reference_timestamp(topic_file)
+    return resolve_relative_time_string(time_string, reference_timestamp)
+
+
+def extract_user_time(user_time_td, topic_file: str, reference_timestamp: datetime.datetime | None = None):
     user_time_strings = [string for string in user_time_td.stripped_strings]
     assert len(user_time_strings) == 3, f"unexpected number of strings: {user_time_strings}"
     user, _, time_string = user_time_strings
 
-    timestamp = parse_time_string(time_string, topic_file)
+    timestamp = parse_time_string(time_string, topic_file, reference_timestamp=reference_timestamp)
     # timestamp = time_string
     return user, timestamp
 
@@ -117,7 +221,7 @@ def parse_found(topic_title):
     return True if re.search(r"\bfound\b", topic_title, re.IGNORECASE) else False
 
 
-def parse_row(tr, topic_file):
+def parse_row(tr, topic_file, reference_timestamp: datetime.datetime | None = None):
     topic_number = extract_topic_number(tr)
     tds = tr.find_all("td")
     # if len(tds) != 4:
@@ -129,7 +233,7 @@ def parse_row(tr, topic_file):
         tds = tds[1:]
     topic_title_td, num_posts_td, user_time_td, _ = tds
     topic_title = parse_topic_title(topic_title_td)
-    user, timestamp = extract_user_time(user_time_td, topic_file)
+    user, timestamp = extract_user_time(user_time_td, topic_file, reference_timestamp=reference_timestamp)
     unread, num_posts = parse_num_posts(num_posts_td)
     found = parse_found(topic_title)
     return {
@@ -144,7 +248,7 @@ def parse_row(tr, topic_file):
 
 
 def read_topic_file(topic_file):
-    with open(topic_file) as fh:
+    with open(topic_file, encoding="utf-8") as fh:
         soup = BeautifulSoup(fh, "lxml")
         return soup
 
@@ -162,11 +266,258 @@ def parse_topic_page(topic_file: str):
     thread_rows = talk_table.find_all("tr")
     # URL, timestamp, user, found, num_posts
     threads = []
+    reference_timestamp = get_reference_timestamp(topic_file)
     for tr in thread_rows:
         if "onclick" not in tr.attrs:
             continue
         if "pinnedtopic" in tr.attrs["class"]:
             continue
-        thread_info = parse_row(tr, topic_file)
+        thread_info = parse_row(tr, topic_file, reference_timestamp=reference_timestamp)
         threads.append(thread_info)
     return threads
+
+
+# Batch parsing of topic page crawl archives with lxml
+
+TOPIC_ROW_FIELDS = [
+    "topic_number",
+    "topic_title",
+    "user",
+    "last_post_timestamp",
+    "crawl_timestamp",
+    "num_posts",
+    "found",
+]
+
+# rows of the talktable that link to a topic, excluding the pinned topics
+TALKTABLE_ROWS_XPATH = (
+    "//table[@id='talktable']//tr[@onclick][not(contains(concat(' ', normalize-space(@class), ' '), ' pinnedtopic '))]"
+)
+
+
+# the saved pages are UTF-8, as read by read_topic_file, but lxml decodes pages without a <meta charset> as latin-1
+TOPIC_PAGE_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+def read_topic_tree(topic_file: str):
+    return lxml.html.parse(topic_file, parser=TOPIC_PAGE_PARSER)
+
+
+class LxmlElement:
+    # minimal adapter that gives an lxml element the BeautifulSoup interface used by the row parsers
+
+    def __init__(self, element):
+        self.element = element
+        self.text = element.text_content()
+        self.attrs = dict(element.attrib)
+        self.attrs["class"] = element.get("class", "").split()
+
+    @property
+    def stripped_strings(self):
+        for string in self.element.itertext():
+            string = string.strip()
+            if string:
+                yield string
+
+
+def lxml_row_tds(tr):
+    tds = [LxmlElement(td) for td in tr.xpath(".//td")]
+    if len(tds) == 5 and "ignore" in tds[4].attrs["class"]:
+        tds = tds[1:]
+    return tds
+
+
+def parse_lxml_row(tr, topic_file: str, reference_timestamp: datetime.datetime, crawl_timestamp: str):
+    topic_number = extract_topic_number(LxmlElement(tr))
+    topic_title_td, num_posts_td, user_time_td, _ = lxml_row_tds(tr)
+    topic_title = parse_topic_title(topic_title_td)
+    user, timestamp = extract_user_time(user_time_td, topic_file, reference_timestamp=reference_timestamp)
+    unread, num_posts = parse_num_posts(num_posts_td)
+    return {
+        "topic_number": topic_number,
+        "topic_title": topic_title,
+        "user": user,
+        "last_post_timestamp": timestamp,
+        "crawl_timestamp": crawl_timestamp,
+        "num_posts": num_posts,
+        "found": parse_found(topic_title),
+    }
+
+
+def parse_topic_file_rows(topic_file: str):
+    # the reference timestamp and crawl timestamp are the same for all rows of a file
+    reference_timestamp = get_reference_timestamp(topic_file)
+    crawl_timestamp = datetime.datetime.now().isoformat()
+    tree = read_topic_tree(topic_file)
+    return [
+        parse_lxml_row(tr, topic_file, reference_timestamp, crawl_timestamp) for tr in tree.xpath(TALKTABLE_ROWS_XPATH)
+    ]
+
+
+def _parse_topic_file_rows(topic_file: str):
+    # error-tolerant wrapper for the worker processes, so that one broken file does not abort the batch
+    try:
+        return topic_file, parse_topic_file_rows(topic_file), None
+    except Exception as e:
+        return topic_file, [], f"{type(e).__name__}: {e}"
+
+
+def serialise_row(row: dict):
+    # the timestamp is serialised as in a DataFrame written with to_csv, so that CSV and Parquet rows have the same types
+    return {**row, "last_post_timestamp": str(row["last_post_timestamp"])}
+
+
+class CSVRowWriter:
+    def __init__(self, output: str):
+        self.out_f = open(output, "w", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(
+            self.out_f, fieldnames=TOPIC_ROW_FIELDS, delimiter="\t" if output.endswith(".tsv") else ","
+        )
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(serialise_row(row) for row in rows)
+
+    def close(self):
+        self.out_f.close()
+
+
+class ParquetRowWriter:
+    def __init__(self, output: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                ("topic_number", pa.string()),
+                ("topic_title", pa.string()),
+                ("user", pa.string()),
+                ("last_post_timestamp", pa.string()),
+                ("crawl_timestamp", pa.string()),
+                ("num_posts", pa.int64()),
+                ("found", pa.bool_()),
+            ]
+        )
+        self.writer = pq.ParquetWriter(output, self.schema)
+
+    def write(self, rows):
+        if rows:
+            self.writer.write_table(self.pa.Table.from_pylist([serialise_row(row) for row in rows], schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def parse_topic_files(pattern: str, output: str, max_workers: int | None = None, progress=None):
+    # parse all topic files matching the glob pattern in a process pool and stream their rows into a single CSV, TSV
+    # or Parquet file, in the sorted order of the files. Returns the number of rows and the files that failed.
+    topic_files = sorted(glob.glob(pattern, recursive=True))
+    writer = ParquetRowWriter(output) if output.endswith(".parquet") else CSVRowWriter(output)
+    row_count = 0
+    failed = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(_parse_topic_file_rows, topic_files, chunksize=max(1, len(topic_files) // 256))
+            if progress is not None:
+                results = progress(results, total=len(topic_files))
+            for topic_file, rows, error in results:
+                if error is not None:
+                    failed.append((topic_file, error))
+                writer.write(rows)
+                row_count += len(rows)
+    finally:
+        writer.close()
+    return row_count, failed
+
+
+# Micro-benchmark of the time string parsers
+
+
+def collect_time_strings(topic_files: list[str]):
+    # the (time string, reference timestamp) pairs of all rows in the topic files, skipping rows without a time string
+    time_strings = []
+    for topic_file in topic_files:
+        reference_timestamp = get_reference_timestamp(topic_file)
+        for tr in read_topic_tree(topic_file).xpath(TALKTABLE_ROWS_XPATH):
+            try:
+                _, _, user_time_td, _ = lxml_row_tds(tr)
+                time_strings.append((list(user_time_td.stripped_strings)[-1], reference_timestamp))
+            except (ValueError, IndexError):
+                continue
+    return time_strings
+
+
+def clear_time_string_caches():
+    classify_time_string.cache_clear()
+    resolve_relative_time_string.cache_clear()
+
+
+def compare_time_parsers(time_string: str, reference_timestamp: datetime.datetime):
+    # "error" if either parser fails on the time string, otherwise whether both parsers return the same timestamp
+    try:
+        expected = parse_time_string_dateutil(time_string, reference_timestamp)
+        actual = parse_time_string(time_string, None, reference_timestamp=reference_timestamp)
+    except Exception:
+        return "error"
+    return "match" if expected == actual else "mismatch"
+
+
+def parseable_rows(topic_files: list[str]):
+    # the (topic file, reference timestamp, row) triples of all rows that parse without an error
+    rows = []
+    for topic_file in topic_files:
+        reference_timestamp = get_reference_timestamp(topic_file)
+        for tr in read_topic_tree(topic_file).xpath(TALKTABLE_ROWS_XPATH):
+            try:
+                parse_lxml_row(tr, topic_file, reference_timestamp, "")
+            except Exception:
+                continue
+            rows.append((topic_file, reference_timestamp, tr))
+    return rows
+
+
+def benchmark_time_parsing(pattern: str, repeat: int = 5):
+    # time the dateutil reference parser, the compiled parser with empty caches, and the memoised compiled parser over
+    # the time strings of all rows in the topic files matching the glob pattern. Time strings that either parser fails
+    # on are counted and left out of the timings, as are rows that fail to parse. Returns the counts of matching,
+    # mismatching and failing time strings, the best of `repeat` runs per parser, and the best run of parsing all rows
+    # with the compiled parser, for comparison with the per-row cost
+    topic_files = sorted(glob.glob(pattern, recursive=True))
+    counts = {"match": 0, "mismatch": 0, "error": 0}
+    time_strings = []
+    for time_string, reference_timestamp in collect_time_strings(topic_files):
+        result = compare_time_parsers(time_string, reference_timestamp)
+        counts[result] += 1
+        if result != "error":
+            time_strings.append((time_string, reference_timestamp))
+    rows = parseable_rows(topic_files)
+
+    def run_dateutil():
+        for time_string, reference_timestamp in time_strings:
+            parse_time_string_dateutil(time_string, reference_timestamp)
+
+    def run_compiled():
+        for time_string, reference_timestamp in time_strings:
+            parse_time_string(time_string, None, reference_timestamp=reference_timestamp)
+
+    def run_rows():
+        for topic_file, reference_timestamp, tr in rows:
+            parse_lxml_row(tr, topic_file, reference_timestamp, "")
+
+    def best_of(function, setup=None):
+        timings = []
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    timings = {
+        "dateutil": best_of(run_dateutil),
+        "compiled": best_of(run_compiled, setup=clear_time_string_caches),
+        "compiled, memoised": best_of(run_compiled),
+    }
+    return counts, timings, best_of(run_rows, setup=clear_time_string_caches)
@@ -0,0 +1,162 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Persistent cache for the responses of the external lookup services."""
+
+import json
+import os
+import sqlite3
+from collections.abc import Callable
+from functools import lru_cache
+from threading import Lock
+from time import time
+from typing import Any
+
+from llm_complex_leisure_search.settings import settings
+
+
+class CacheMissError(Exception):
+    """Error indicating that a response is not in the cache and the cache is in offline mode."""
+
+
+def normalise_query(query: str) -> str:
+    """Normalise a query string by collapsing whitespace and case-folding it."""
+    return " ".join(query.split()).casefold()
+
+
+class ResponseCache:
+    """SQLite-backed key-value cache for the responses of the external lookup services.
+
+    Responses are stored as JSON, keyed by the service name and the normalised query. Entries older than `ttl` seconds
+    are treated as missing and, whenever the total size of the stored responses exceeds `max_size` bytes, the least
+    recently used entries are removed. In `offline` mode, cache misses raise a :class:`CacheMissError` instead of
+    fetching the response.
+    """
+
+    def __init__(self, path: str, ttl: float, max_size: int, offline: bool = False):  # noqa: FBT001, FBT002
+        """Open the cache database at `path`, creating it if necessary."""
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.offline = offline
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = Lock()
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (service TEXT NOT NULL, query TEXT NOT NULL, value TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL, PRIMARY KEY (service, query))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    def _is_fresh(self, created: float) -> bool:
+        """Check whether an entry created at `created` is still within the TTL."""
+        return self.ttl <= 0 or time() - created <= self.ttl
+
+    def get(self, service: str, query: str) -> tuple[bool, Any]:
+        """Look up a response, returning a `(found, value)` tuple."""
+        key = normalise_query(query)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE service = ? AND query = ?", (service, key)
+            ).fetchone()
+            if row is None or not self._is_fresh(row[1]):
+                return (False, None)
+            self._db.execute(
+                "UPDATE responses SET accessed = ? WHERE service = ? AND query = ?", (time(), service, key)
+            )
+        return (True, json.loads(row[0]))
+
+    def set(self, service: str, query: str, value: Any) -> None:
+        """Store a response."""
+        data = json.dumps(value)
+        now = time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (service, query, value, created, accessed, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (service, normalise_query(query), data, now, now, len(data)),
+            )
+            self._enforce_size_limit()
+
+    def cached(self, service: str, query: str, fetch: Callable[[], Any]) -> Any:
+        """Return the cached response for the query, calling `fetch` and storing its result on a cache miss.
+
+        If `fetch` returns `None`, the result is treated as a failed request and is not stored.
+        """
+        found, value = self.get(service, query)
+        if found:
+            return value
+        if self.offline:
+            msg = f"No cached {service} response for {query!r}"
+            raise CacheMissError(msg)
+        value = fetch()
+        if value is not None:
+            self.set(service, query, value)
+        return value
+
+    def _enforce_size_limit(self) -> None:
+        """Remove the least recently used entries until the cache is within its size limit."""
+        if self.max_size <= 0:
+            return
+        excess = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0] - self.max_size
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM (SELECT rowid, size, SUM(size) OVER "
+                "(ORDER BY accessed, rowid) AS running FROM responses) WHERE running - size < ?)",
+                (excess,),
+            )
+
+    def stats(self) -> list[dict]:
+        """Return the number of entries, their total size, and the oldest and newest entry for each service."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT service, COUNT(*), SUM(size), MIN(created), MAX(created), "
+                "SUM(CASE WHEN ? > 0 AND ? - created > ? THEN 1 ELSE 0 END) "
+                "FROM responses GROUP BY service ORDER BY service",
+                (self.ttl, time(), self.ttl),
+            ).fetchall()
+        return [
+            {
+                "service": row[0],
+                "entries": row[1],
+                "size": row[2],
+                "oldest": row[3],
+                "newest": row[4],
+                "expired": row[5],
+            }
+            for row in rows
+        ]
+
+    def prune(self, service: str | None = None, expired_only: bool = True) -> int:  # noqa: FBT001, FBT002
+        """Remove entries from the cache and return how many entries were removed.
+
+        By default only expired entries are removed. If `expired_only` is `False`, all entries are removed. Removal
+        can be restricted to a single `service`.
+        """
+        conditions = []
+        params = []
+        if service is not None:
+            conditions.append("service = ?")
+            params.append(service)
+        if expired_only:
+            if self.ttl <= 0:
+                return 0
+            conditions.append("? - created > ?")
+            params.extend([time(), self.ttl])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            removed = self._db.execute(f"DELETE FROM responses{where}", params).rowcount  # noqa: S608
+            self._enforce_size_limit()
+        self._db.execute("VACUUM")
+        return removed
+
+    def close(self) -> None:
+        """Close the cache database."""
+        self._db.close()
+
+
+@lru_cache(maxsize=1)
+def response_cache() -> ResponseCache:
+    """Return the shared :class:`ResponseCache` configured via the `cache` settings."""
+    return ResponseCache(settings.cache.path, settings.cache.ttl, settings.cache.max_size, settings.cache.offline)
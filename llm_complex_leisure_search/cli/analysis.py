@@ -7,7 +7,6 @@ import itertools
 import os
 from csv import DictWriter
 
-from rich import print as console
 from rich.progress import track
 from typer import Typer
 
@@ -16,11 +15,6 @@ from llm_complex_leisure_search.analysis.basic_stats import (
     confidence_counts,
     data_set_summary_stats,
     duplicate_counts,
-    llm_solved_at_rank,
-    llm_solved_at_rank_avg,
-    llm_solved_at_rank_single,
-    llm_solved_mmr,
-    llm_solved_stats,
     llm_summary_stats,
 )
 from llm_complex_leisure_search.analysis.comparison_stats import compare_artifact_rank_stats
@@ -30,7 +24,10 @@ from llm_complex_leisure_search.analysis.correlation_stats import (
     correlate_popularity_confidence,
     correlate_popularity_rank,
 )
-from llm_complex_leisure_search.constants import DOMAINS, LLMS
+from llm_complex_leisure_search.analysis.data import load_tasks
+from llm_complex_leisure_search.analysis.evaluation import load_rank_evaluation
+from llm_complex_leisure_search.analysis.matrix import Report, run_reports, single_file_report
+from llm_complex_leisure_search.constants import DOMAINS
 
 group = Typer(name="analysis", help="Commands for data analysis")
 
@@ -47,406 +44,282 @@ def summary_stats() -> None:
             writer.writerow(row)
 
 
+LLM_STATS_REPORT = single_file_report(
+    "llm-summary.csv",
+    [
+        "threads.answered",
+        "threads.answered.fraction",
+        "results.length.min",
+        "results.length.q1",
+        "results.length.median",
+        "results.length.q3",
+        "results.length.max",
+        "results.total",
+    ],
+    llm_summary_stats,
+)
+
+
 @group.command()
 def llm_stats() -> None:
     """Generate llm summary statistics."""
-    with open(os.path.join("analysis", "llm-summary.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "threads.answered",
-                "threads.answered.fraction",
-                "results.length.min",
-                "results.length.q1",
-                "results.length.median",
-                "results.length.q3",
-                "results.length.max",
-                "results.total",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating summary stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(llm_summary_stats(domain, llm))
-                    writer.writerow(row)
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([LLM_STATS_REPORT], "Generating summary stats")
+
+
+def solved_rows(domain: str, llm: str, tasks: list[dict]) -> dict[str, dict]:
+    """Calculate the solved statistics rows for a single domain and LLM, from the domain's already loaded `tasks`."""
+    evaluation = load_rank_evaluation(domain, llm, tasks)
+    best_row = {}
+    single_row = {}
+    average_row = {}
+    for rank in range(0, 20):
+        best_row.update(evaluation.solved_at_rank(rank))
+        single_row.update(evaluation.solved_at_rank_single(rank))
+        average_row.update(evaluation.solved_at_rank_avg(rank))
+    best_row.update(evaluation.mmr(best_row))
+    single_row.update(evaluation.mmr(single_row, solved_factor=3))
+    average_row.update(evaluation.mmr(average_row, field_suffix=".avg"))
+    return {
+        "solved-best.csv": best_row,
+        "solved.csv": single_row,
+        "solved-average.csv": average_row,
+        "solved-stats.csv": evaluation.solved_stats(),
+    }
+
+
+SOLVED_STATS_REPORT = Report(
+    {
+        "solved-best.csv": ["domain", "llm", "mmr"]
+        + [f"solved.{rank + 1}" for rank in range(0, 20)]
+        + [f"solved.{rank + 1}.fraction" for rank in range(0, 20)],
+        "solved.csv": ["domain", "llm", "mmr"]
+        + [f"solved.{rank + 1}" for rank in range(0, 20)]
+        + [f"solved.{rank + 1}.fraction" for rank in range(0, 20)],
+        "solved-average.csv": [
+            "domain",
+            "llm",
+            "mmr",
+            *itertools.chain(
+                *[
+                    [
+                        f"solved.{rank + 1}.avg",
+                        f"solved.{rank + 1}.stdev",
+                        f"solved.{rank + 1}.fraction.avg",
+                        f"solved.{rank + 1}.fraction.stdev",
+                    ]
+                    for rank in range(0, 20)
+                ]
+            ),
+        ],
+        "solved-stats.csv": ["domain", "llm"]
+        + [f"solved.{rank}" for rank in range(0, 4)]
+        + [f"solved.{rank}.fraction" for rank in range(0, 4)],
+    },
+    solved_rows,
+    domain_data=load_tasks,
+)
 
 
 @group.command()
 def solved_stats() -> None:
     """Generate solved statistics."""
-    with open(os.path.join("analysis", "solved-best.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=["domain", "llm", "mmr"]
-            + [f"solved.{rank + 1}" for rank in range(0, 20)]
-            + [f"solved.{rank + 1}.fraction" for rank in range(0, 20)],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating best solved stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    for rank in range(0, 20):
-                        row.update(llm_solved_at_rank(domain, llm, rank))
-                    row.update(llm_solved_mmr(domain, row))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
-    with open(os.path.join("analysis", "solved.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=["domain", "llm", "mmr"]
-            + [f"solved.{rank + 1}" for rank in range(0, 20)]
-            + [f"solved.{rank + 1}.fraction" for rank in range(0, 20)],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating solved stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    for rank in range(0, 20):
-                        row.update(llm_solved_at_rank_single(domain, llm, rank))
-                    row.update(llm_solved_mmr(domain, row, solved_factor=3))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
-    with open(os.path.join("analysis", "solved-average.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "mmr",
-                *itertools.chain(
-                    *[
-                        [
-                            f"solved.{rank + 1}.avg",
-                            f"solved.{rank + 1}.stdev",
-                            f"solved.{rank + 1}.fraction.avg",
-                            f"solved.{rank + 1}.fraction.stdev",
-                        ]
-                        for rank in range(0, 20)
-                    ]
-                ),
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating average solved stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    for rank in range(0, 20):
-                        row.update(llm_solved_at_rank_avg(domain, llm, rank))
-                    row.update(llm_solved_mmr(domain, row, field_suffix=".avg"))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
-    with open(os.path.join("analysis", "solved-stats.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=["domain", "llm"]
-            + [f"solved.{rank}" for rank in range(0, 4)]
-            + [f"solved.{rank}.fraction" for rank in range(0, 4)],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating solved stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(llm_solved_stats(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([SOLVED_STATS_REPORT], "Generating solved stats")
+
+
+ARTIFACT_STATS_REPORT = single_file_report(
+    "artifacts.csv",
+    [
+        "generated.total",
+        "generated.existing",
+        "generated.existing.fraction",
+        "generated.existing.exact",
+        "generated.existing.exact.fraction",
+    ],
+    artifact_counts,
+)
 
 
 @group.command()
 def artifact_stats() -> None:
     """Generate artifact statistics."""
-    with open(os.path.join("analysis", "artifacts.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "generated.total",
-                "generated.existing",
-                "generated.existing.fraction",
-                "generated.existing.exact",
-                "generated.existing.exact.fraction",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating artifact stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(artifact_counts(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([ARTIFACT_STATS_REPORT], "Generating artifact stats")
+
+
+DUPLICATE_STATS_REPORT = single_file_report(
+    "duplicates.csv",
+    [
+        "results.duplicates",
+        "results.duplicates.fraction",
+        "duplicates.average",
+        "duplicates.min",
+        "duplicates.q1",
+        "duplicates.median",
+        "duplicates.q3",
+        "duplicates.max",
+    ],
+    duplicate_counts,
+)
 
 
 @group.command()
 def duplicate_stats() -> None:
     """Generate duplicate statistics."""
-    with open(os.path.join("analysis", "duplicates.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "results.duplicates",
-                "results.duplicates.fraction",
-                "duplicates.average",
-                "duplicates.min",
-                "duplicates.q1",
-                "duplicates.median",
-                "duplicates.q3",
-                "duplicates.max",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating duplicate stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(duplicate_counts(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([DUPLICATE_STATS_REPORT], "Generating duplicate stats")
+
+
+CONFIDENCE_STATS_REPORT = single_file_report(
+    "confidence.csv",
+    [
+        "confidence.average",
+        "confidence.std",
+        "confidence.min",
+        "confidence.q1",
+        "confidence.median",
+        "confidence.q3",
+        "confidence.max",
+        "confidence.noscore",
+    ],
+    confidence_counts,
+)
 
 
 @group.command()
 def confidence_stats() -> None:
     """Generate confidence statistics."""
-    with open(os.path.join("analysis", "confidence.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "confidence.average",
-                "confidence.std",
-                "confidence.min",
-                "confidence.q1",
-                "confidence.median",
-                "confidence.q3",
-                "confidence.max",
-                "confidence.noscore",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Generating duplicate stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(confidence_counts(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([CONFIDENCE_STATS_REPORT], "Generating confidence stats")
 
 
 @group.command()
 def all_stats() -> None:
-    """Generate all statistics."""
+    """Generate all statistics, calculating the cells of all statistics in parallel."""
     summary_stats()
-    llm_stats()
-    solved_stats()
-    artifact_stats()
-    duplicate_stats()
+    run_reports(
+        [LLM_STATS_REPORT, SOLVED_STATS_REPORT, ARTIFACT_STATS_REPORT, DUPLICATE_STATS_REPORT],
+        "Generating all stats",
+    )
+
+
+COMPARE_ARTIFACT_RANKS_REPORT = single_file_report(
+    "compare-artifact-ranks.csv",
+    [
+        "real.rank.min",
+        "real.rank.q1",
+        "real.rank.median",
+        "real.rank.q3",
+        "real.rank.max",
+        "real.rank.avg",
+        "real.rank.std",
+        "artifact.rank.min",
+        "artifact.rank.q1",
+        "artifact.rank.median",
+        "artifact.rank.q3",
+        "artifact.rank.max",
+        "artifact.rank.avg",
+        "artifact.rank.std",
+        "mwu.two_sided.statistic",
+        "mwu.two_sided.pvalue",
+        "mwu.greater.statistic",
+        "mwu.greater.pvalue",
+        "mwu.less.statistic",
+        "mwu.less.pvalue",
+    ],
+    compare_artifact_rank_stats,
+)
 
 
 @group.command()
 def compare_artifact_ranks() -> None:
     """Generate stats whether the real/artifact answer rank distributions differ."""
-    with open(os.path.join("analysis", "compare-artifact-ranks.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "real.rank.min",
-                "real.rank.q1",
-                "real.rank.median",
-                "real.rank.q3",
-                "real.rank.max",
-                "real.rank.avg",
-                "real.rank.std",
-                "artifact.rank.min",
-                "artifact.rank.q1",
-                "artifact.rank.median",
-                "artifact.rank.q3",
-                "artifact.rank.max",
-                "artifact.rank.avg",
-                "artifact.rank.std",
-                "mwu.two_sided.statistic",
-                "mwu.two_sided.pvalue",
-                "mwu.greater.statistic",
-                "mwu.greater.pvalue",
-                "mwu.less.statistic",
-                "mwu.less.pvalue",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Calculating distribution stats"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(compare_artifact_rank_stats(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([COMPARE_ARTIFACT_RANKS_REPORT], "Calculating distribution stats")
+
+
+CONFIDENCE_CORRECT_CORRELATION_REPORT = single_file_report(
+    "correlate-correct.csv",
+    [
+        "lr.confidence.avg",
+        "lr.confidence.stdev",
+        "lr.confidence.pos.avg",
+        "lr.confidence.pos.stdev",
+        "lr.confidence.neg.avg",
+        "lr.confidence.neg.stdev",
+        "lr.rank.avg",
+        "lr.rank.stdev",
+        "lr.rank.pos.avg",
+        "lr.rank.pos.stdev",
+        "lr.rank.neg.avg",
+        "lr.rank.neg.stdev",
+        "lr.combined.avg",
+        "lr.combined.stdev",
+        "lr.combined.pos.avg",
+        "lr.combined.pos.stdev",
+        "lr.combined.neg.avg",
+        "lr.combined.neg.stdev",
+    ],
+    correlate_correct,
+)
 
 
 @group.command()
 def confidence_correct_correlation() -> None:
     """Generate confidence - correctness stats."""
-    with open(os.path.join("analysis", "correlate-correct.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "lr.confidence.avg",
-                "lr.confidence.stdev",
-                "lr.confidence.pos.avg",
-                "lr.confidence.pos.stdev",
-                "lr.confidence.neg.avg",
-                "lr.confidence.neg.stdev",
-                "lr.rank.avg",
-                "lr.rank.stdev",
-                "lr.rank.pos.avg",
-                "lr.rank.pos.stdev",
-                "lr.rank.neg.avg",
-                "lr.rank.neg.stdev",
-                "lr.combined.avg",
-                "lr.combined.stdev",
-                "lr.combined.pos.avg",
-                "lr.combined.pos.stdev",
-                "lr.combined.neg.avg",
-                "lr.combined.neg.stdev",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Calculating correlations"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(correlate_correct(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([CONFIDENCE_CORRECT_CORRELATION_REPORT], "Calculating correlations")
+
+
+CONFIDENCE_RANK_CORRELATION_REPORT = single_file_report(
+    "correlate-confidence-rank.csv",
+    [
+        "pearsonr.statistic",
+        "pearsonr.pvalue",
+        "spearmanr.statistic",
+        "spearmanr.pvalue",
+        "kendalltau.statistic",
+        "kendalltau.pvalue",
+    ],
+    correlate_confidence_rank,
+)
 
 
 @group.command()
 def confidence_rank_correlation() -> None:
     """Generate confidence - rank stats."""
-    with open(os.path.join("analysis", "correlate-confidence-rank.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "pearsonr.statistic",
-                "pearsonr.pvalue",
-                "spearmanr.statistic",
-                "spearmanr.pvalue",
-                "kendalltau.statistic",
-                "kendalltau.pvalue",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Calculating correlations"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(correlate_confidence_rank(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([CONFIDENCE_RANK_CORRELATION_REPORT], "Calculating correlations")
+
+
+POPULARITY_RANK_CORRELATION_REPORT = single_file_report(
+    "correlate-popularity-rank.csv",
+    [
+        "pearsonr.statistic",
+        "pearsonr.pvalue",
+        "spearmanr.statistic",
+        "spearmanr.pvalue",
+        "kendalltau.statistic",
+        "kendalltau.pvalue",
+    ],
+    correlate_popularity_rank,
+)
 
 
 @group.command()
 def popularity_rank_correlation() -> None:
     """Generate popularity - rank stats."""
-    with open(os.path.join("analysis", "correlate-popularity-rank.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "pearsonr.statistic",
-                "pearsonr.pvalue",
-                "spearmanr.statistic",
-                "spearmanr.pvalue",
-                "kendalltau.statistic",
-                "kendalltau.pvalue",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Calculating correlations"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(correlate_popularity_rank(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([POPULARITY_RANK_CORRELATION_REPORT], "Calculating correlations")
+
+
+POPULARITY_CONFIDENCE_CORRELATION_REPORT = single_file_report(
+    "correlate-popularity-confidence.csv",
+    [
+        "pearsonr.statistic",
+        "pearsonr.pvalue",
+        "spearmanr.statistic",
+        "spearmanr.pvalue",
+        "kendalltau.statistic",
+        "kendalltau.pvalue",
+    ],
+    correlate_popularity_confidence,
+)
 
 
 @group.command()
 def popularity_confidence_correlation() -> None:
     """Generate popularity - confidence stats."""
-    with open(os.path.join("analysis", "correlate-popularity-confidence.csv"), "w") as out_f:
-        writer = DictWriter(
-            out_f,
-            fieldnames=[
-                "domain",
-                "llm",
-                "pearsonr.statistic",
-                "pearsonr.pvalue",
-                "spearmanr.statistic",
-                "spearmanr.pvalue",
-                "kendalltau.statistic",
-                "kendalltau.pvalue",
-            ],
-        )
-        writer.writeheader()
-        for domain in track(DOMAINS, description="Calculating correlations"):
-            for llm in LLMS:
-                try:
-                    row = {"domain": domain, "llm": llm}
-                    row.update(correlate_popularity_confidence(domain, llm))
-                    writer.writerow(row)
-                except KeyError as e:
-                    console(f"{e} not found")
-                except FileNotFoundError as e:
-                    console(e)
+    run_reports([POPULARITY_CONFIDENCE_CORRELATION_REPORT], "Calculating correlations")
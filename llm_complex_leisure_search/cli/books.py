@@ -6,38 +6,33 @@
 import json
 import os
 from csv import DictReader
+from typing import Annotated
 
+from rich import print as console
 from rich.progress import track
-from typer import Typer
+from rich.table import Table
+from typer import Option, Typer
 
 from llm_complex_leisure_search.books.data import PROMPT_TEMPLATE, extract_solved_threads
-from llm_complex_leisure_search.gemini import generate_multiple_responses as gemini_generate
-from llm_complex_leisure_search.llms.llama import generate_multiple_responses as llama_generate
+from llm_complex_leisure_search.books.openlibrary_api import check_answers
+from llm_complex_leisure_search.constants import ANNOTATION_DATA_SETS
+from llm_complex_leisure_search.extraction import read_first_posts, read_ignored, stream_posts
+from llm_complex_leisure_search.lookup import LookupPipeline
+from llm_complex_leisure_search.query import run_query
 from llm_complex_leisure_search.settings import settings
 from llm_complex_leisure_search.util import split_book_title_by_author
 
 group = Typer(name="books", help="Commands for book-related processing")
-ANNOTATION_SOURCE_FILES = ["jdoc", "extra", "goodreads"]
 LLM_MODELS = [("Gemini", "gemini"), ("GPT 4o Mini", "gpt-4o-mini")]
 
 
 @group.command()
 def extract() -> None:
     """Extract all solved book threads."""
-    for suffix in ANNOTATION_SOURCE_FILES:
-        first_posts = []
-        with open(os.path.join("data", "books", f"first-posts_{suffix}.tsv")) as in_f:
-            reader = DictReader(in_f, delimiter="\t")
-            for record in reader:
-                first_posts.append(record)
-        records = []
-        with open(os.path.join("data", "books", f"posts_{suffix}.csv")) as in_f:
-            reader = DictReader(in_f)
-            for record in reader:
-                records.append(record)
-        with open(os.path.join("data", "books", f"ignored_{suffix}.txt")) as in_f:
-            ignored = [thread_id.strip() for thread_id in in_f.readlines() if thread_id.strip()]
-        solved = extract_solved_threads(first_posts, records, ignored)
+    for suffix in ANNOTATION_DATA_SETS["books"]:
+        solved = extract_solved_threads(
+            read_first_posts("books", suffix), stream_posts("books", suffix), read_ignored("books", suffix)
+        )
         with open(os.path.join("data", "books", f"solved_{suffix}.json"), "w") as out_f:
             json.dump(solved, out_f)
 
@@ -65,84 +60,13 @@ def extract_goodreads() -> None:
 @group.command()
 def query_gemini() -> None:
     """Process the books with Gemini."""
-    for suffix in ANNOTATION_SOURCE_FILES:
-        with open(os.path.join("data", "books", f"solved_{suffix}.json")) as in_f:
-            tasks = json.load(in_f)
-        if os.path.exists(os.path.join("data", "books", f"gemini_{suffix}.json")):
-            with open(os.path.join("data", "books", f"gemini_{suffix}.json")) as in_f:
-                results = json.load(in_f)
-        else:
-            results = []
-        for task in track(tasks, description=f"Querying Gemini ({suffix})"):
-            # Check if the task has already been processed
-            exists = False
-            for result in results:
-                if result["thread_id"] == task["thread_id"] and len(result["results"]) >= settings.llm.retest_target:
-                    exists = True
-                    break
-            if exists:
-                continue
-            result = {
-                "thread_id": task["thread_id"],
-                "results": gemini_generate(task["prompt"]),
-            }
-            for attempt in result["results"]:
-                if attempt is not None:
-                    for entry in attempt:
-                        title, author = split_book_title_by_author(entry["answer"])
-                        entry["title"] = title
-                        entry["qualifiers"] = [author]
-            results.append(result)
-            with open(os.path.join("data", "books", f"gemini_{suffix}.json"), "w") as out_f:
-                json.dump(results, out_f)
+    run_query("books", "gemini")
 
 
 @group.command()
 def query_llama() -> None:
     """Process the books with Llama."""
-    for suffix in ANNOTATION_SOURCE_FILES:
-        if os.path.exists(os.path.join("data", "books", f"solved_{suffix}.json")):
-            with open(os.path.join("data", "books", f"solved_{suffix}.json")) as in_f:
-                tasks = json.load(in_f)
-        else:
-            tasks = []
-        if os.path.exists(os.path.join("data", "books", f"llama-3-2_{suffix}.json")):
-            with open(os.path.join("data", "books", f"llama-3-2_{suffix}.json")) as in_f:
-                results = json.load(in_f)
-        else:
-            results = []
-        for task in track(tasks, description=f"Querying Llama 3.2 ({suffix})"):
-            # Check if the task has already been processed
-            exists = False
-            for result in results:
-                if result["thread_id"] == task["thread_id"] and len(result["results"]) >= settings.llm.retest_target:
-                    exists = True
-                    break
-            if exists:
-                continue
-            result = {
-                "thread_id": task["thread_id"],
-                "results": llama_generate(task["prompt"]),
-            }
-            for attempt in result["results"]:
-                if attempt is not None:
-                    for entry in attempt:
-                        if isinstance(entry["answer"], dict) and "title" in entry["answer"]:
-                            entry["title"] = entry["answer"]["title"]
-                            if "author" in entry["answer"] and entry["answer"]["author"] is not None:
-                                entry["qualifiers"] = [entry["answer"]["author"]]
-                            else:
-                                entry["qualifiers"] = []
-                        elif isinstance(entry["answer"], str):
-                            title, author = split_book_title_by_author(entry["answer"])
-                            entry["title"] = title
-                            if author is not None:
-                                entry["qualifiers"] = [author]
-                            else:
-                                entry["qualifiers"] = []
-            results.append(result)
-            with open(os.path.join("data", "books", f"llama-3-2_{suffix}.json"), "w") as out_f:
-                json.dump(results, out_f)
+    run_query("books", "ollama")
 
 
 @group.command()
@@ -204,3 +128,64 @@ def merge_openlibrary_answers(source_file: str) -> None:
                                 answer["exists_with_qualifier"] = True
     with open(os.path.join("data", "books", "unique-answers.json"), "w") as out_f:
         json.dump(answers, out_f)
+
+
+@group.command()
+def lookup_answers() -> None:
+    """Lookup the answers in OpenLibrary."""
+    pipeline = LookupPipeline(
+        check_answers, settings.openlibrary.max_concurrency, settings.openlibrary.requests_per_second
+    )
+    pipeline.run(os.path.join("data", "books", "unique-answers.json"))
+
+
+@group.command()
+def parse_topic_pages(
+    pattern: str,
+    output: str,
+    max_workers: Annotated[
+        int | None, Option(help="Number of worker processes, defaults to the number of CPUs")
+    ] = None,
+) -> None:
+    """Parse the saved LibraryThing topic list pages matching a glob pattern in parallel.
+
+    The threads are written to a single output file, as Parquet, TSV, or CSV depending on the output's extension.
+    Requires the `books` extra dependencies (lxml, and pyarrow for Parquet output).
+    """
+    from llm_complex_leisure_search.books.parse import parse_topic_files
+
+    row_count, failed = parse_topic_files(
+        pattern,
+        output,
+        max_workers=max_workers,
+        progress=lambda results, total: track(results, total=total, description="Parsing topic pages"),
+    )
+    for topic_file, error in failed:
+        console(f"[red bold]{topic_file}:[/red bold] {error}")
+    console(f"Wrote {row_count} threads to {output}")
+
+
+@group.command()
+def benchmark_time_parsing(pattern: str, repeat: int = 5) -> None:
+    """Benchmark the time string parsers on the saved LibraryThing topic list pages matching a glob pattern.
+
+    Requires the `books` extra dependencies.
+    """
+    from llm_complex_leisure_search.books.parse import benchmark_time_parsing
+
+    counts, timings, rows_seconds = benchmark_time_parsing(pattern, repeat=repeat)
+    count = counts["match"] + counts["mismatch"]
+    table = Table("Parser", "Total (ms)", "Per time string (µs)", "Speed-up")
+    for name, seconds in timings.items():
+        table.add_row(
+            name,
+            f"{seconds * 1000:.1f}",
+            f"{seconds / max(count, 1) * 1000000:.2f}",
+            f"{timings['dateutil'] / seconds:.1f}x" if seconds > 0 else "-",
+        )
+    table.add_row("parse rows, compiled", f"{rows_seconds * 1000:.1f}", "-", "-")
+    console(table)
+    console(
+        f"{count} time strings, {counts['mismatch']} differ from the dateutil parser, "
+        f"{counts['error']} could not be parsed and were skipped"
+    )
@@ -0,0 +1,38 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Response cache CLI commands."""
+
+from datetime import UTC, datetime
+
+from rich import print as console
+from rich.table import Table
+from typer import Typer
+
+from llm_complex_leisure_search.cache import response_cache
+
+group = Typer(name="cache", help="Commands for managing the lookup response cache")
+
+
+@group.command()
+def stats() -> None:
+    """Show the number of cached responses per service."""
+    cache = response_cache()
+    table = Table("Service", "Entries", "Expired", "Size (kB)", "Oldest", "Newest", title=cache.path)
+    for row in cache.stats():
+        table.add_row(
+            row["service"],
+            str(row["entries"]),
+            str(row["expired"]),
+            f"{row['size'] / 1024:.1f}",
+            datetime.fromtimestamp(row["oldest"], tz=UTC).strftime("%Y-%m-%d %H:%M"),
+            datetime.fromtimestamp(row["newest"], tz=UTC).strftime("%Y-%m-%d %H:%M"),
+        )
+    console(table)
+
+
+@group.command()
+def prune(service: str | None = None, all_entries: bool = False) -> None:  # noqa: FBT001, FBT002
+    """Remove the expired responses, or all responses with --all-entries, optionally only for one service."""
+    removed = response_cache().prune(service=service, expired_only=not all_entries)
+    console(f"Removed {removed} cached responses")
@@ -6,46 +6,52 @@
 import json
 import os
 
+from pydantic import ValidationError
 from rich import print as console
 from rich.progress import track
 from typer import Typer
 
+from llm_complex_leisure_search.analysis.catalogue import answer_key
+from llm_complex_leisure_search.analysis.results import load_result_file
 from llm_complex_leisure_search.constants import DATA_SETS, DOMAINS, LLMS
-from llm_complex_leisure_search.util import extract_all_answers
 
 group = Typer(name="data", help="Commands for data processing")
 
 
 @group.command()
 def extract_unique_answers(restrict_domain: str | None = None) -> None:
-    """Extract the unique answers."""
+    """Extract the unique answers.
+
+    The answers are read via the columnar result cache, so only result files whose content has changed since the last
+    extraction are parsed again. Lookup results for answers that are already in the unique answers file are kept.
+    """
     for domain in DOMAINS:
         if restrict_domain is not None and domain != restrict_domain:
             continue
-        answers = set()
+        answers = {}
         for llm in track(LLMS, description=f"Extracting unique {domain} answers"):
             for data_set in DATA_SETS:
+                path = os.path.join("data", domain, f"{llm}_{data_set}.json")
                 try:
-                    with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-                        answers.update(extract_all_answers(json.load(in_f)))
+                    table = load_result_file(path)
+                    answers.update(dict.fromkeys(table.unique_answers()))
                 except KeyError as e:
                     console(f"[red bold]Error[/red bold] {e} not found")
                 except FileNotFoundError as e:
                     console(f"[red bold]Error[/red bold] {e}")
+                except ValidationError as e:
+                    console(f"[red bold]Error[/red bold] {path} is not a valid result file ({e.error_count()} errors)")
         if os.path.exists(os.path.join("data", domain, "unique-answers.json")):
             with open(os.path.join("data", domain, "unique-answers.json")) as in_f:
                 data = json.load(in_f)
         else:
             data = []
-        result = []
-        for answer in track(answers, description=f"Merging unique {domain} answers"):
-            found = False
-            for old_answer in data:
-                answer_tuple = (old_answer["answer"][0], tuple(old_answer["answer"][1]))
-                if answer_tuple == answer:
-                    result.append(old_answer)
-                    found = True
-            if not found:
-                result.append({"answer": answer, "exists": False, "exists_with_qualifier": False, "popularity": 0})
+        existing = {}
+        for old_answer in data:
+            existing.setdefault(answer_key(old_answer["answer"][0], old_answer["answer"][1]), old_answer)
+        result = [
+            existing.get(answer, {"answer": answer, "exists": False, "exists_with_qualifier": False, "popularity": 0})
+            for answer in answers
+        ]
         with open(os.path.join("data", domain, "unique-answers.json"), "w") as out_f:
             json.dump(result, out_f)
@@ -3,192 +3,69 @@
 # SPDX-License-Identifier: MIT
 """Data fix-related CLI commands."""
 
-import json
 import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from rich import print as console
 from rich.progress import track
+from rich.table import Table
 from typer import Typer
 
 from llm_complex_leisure_search.constants import DATA_SETS, DOMAINS, LLMS
-from llm_complex_leisure_search.util import split_book_title_by_author
+from llm_complex_leisure_search.fixes import FixError, apply_fixes
 
 group = Typer(name="fix", help="Commands for data fixes")
 
 
+def _apply_fixes(domain: str, llm: str, data_set: str, fixes: list[str]) -> Counter:
+    """Apply the fixes to a single result file in a worker process, counting files that cannot be fixed."""
+    try:
+        return apply_fixes(domain, llm, data_set, fixes)
+    except FixError as e:
+        console(f"[red bold]{domain} {llm} {data_set}:[/red bold] {e}")
+        return Counter({"files failed": 1})
+
+
+def run_fixes(fixes: list[str]) -> None:
+    """Apply the `fixes` to all result files in parallel worker processes and show the per-fix counters."""
+    files = [
+        (domain, llm, data_set)
+        for domain in DOMAINS
+        for llm in LLMS
+        for data_set in DATA_SETS
+        if os.path.exists(os.path.join("data", domain, f"{llm}_{data_set}.json"))
+    ]
+    totals = Counter()
+    with ProcessPoolExecutor() as executor:
+        futures = [executor.submit(_apply_fixes, domain, llm, data_set, fixes) for domain, llm, data_set in files]
+        for future in track(as_completed(futures), total=len(futures), description="Applying fixes"):
+            totals.update(future.result())
+    table = Table("Counter", "Value")
+    for name, value in sorted(totals.items()):
+        table.add_row(name, str(value))
+    console(table)
+
+
 @group.command()
 def ensure_result_format() -> None:
     """Ensure all result files are in the correct format."""
-    for domain in track(DOMAINS, description="Applying fixes"):
-        for llm in LLMS:
-            for data_set in DATA_SETS:
-                if not os.path.exists(os.path.join("data", domain, f"{llm}_{data_set}.json")):
-                    continue
-                with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-                    solutions = json.load(in_f)
-
-                for solution in solutions:
-                    results = []
-                    for result_set in solution["results"]:
-                        results.append([entry for entry in result_set if entry["answer"]])
-                    solution["results"] = results
-                    for result_set in solution["results"]:
-                        for entry in result_set:
-                            if "title" not in entry and isinstance(entry["answer"], list):
-                                entry["title"] = entry["answer"][0]
-                                entry["qualifiers"] = entry["answer"][1:]
-                            elif "title" not in entry and isinstance(entry["answer"], dict):
-                                if "Title" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["Title"]
-                                elif "bookTitle" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["bookTitle"]
-                                elif "answer" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["answer"]
-                                elif "name" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["name"]
-                                elif "text" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["text"]
-                                elif "game" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["game"]
-                                elif "suggestion" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["suggestion"]
-                                elif "question" in entry["answer"]:
-                                    entry["title"] = entry["answer"]["question"]
-                                elif isinstance(entry["answer"], dict):
-                                    entry["title"] = next(iter(entry["answer"].keys()))
-                                if "Author" in entry["answer"]:
-                                    entry["qualifiers"] = entry["answer"]["Author"]
-                                elif "author" in entry["answer"]:
-                                    entry["qualifiers"] = [entry["answer"]["author"]]
-                                elif "year" in entry["answer"]:
-                                    entry["qualifiers"] = [entry["answer"]["year"]]
-                                elif "release_year" in entry["answer"]:
-                                    entry["qualifiers"] = [entry["answer"]["release_year"]]
-                                elif "releaseYear" in entry["answer"]:
-                                    entry["qualifiers"] = [entry["answer"]["releaseYear"]]
-                                elif "release year" in entry["answer"]:
-                                    entry["qualifiers"] = [entry["answer"]["release year"]]
-                                elif isinstance(entry["answer"], dict):
-                                    entry["qualifiers"] = next(iter(entry["answer"].values()))
-                            #     else:
-                            #         print(entry)
-                            #         entry["qualifiers"] = []
-                            # if "title" not in entry:
-                            #     print(entry)
-                            #     return
-                            # if "qualifiers" not in entry:
-                            #     print(entry)
-                            #     return
-                            if isinstance(entry["title"], dict):
-                                if "year" in entry["title"]:
-                                    entry["qualifiers"] = entry["title"]["year"]
-                                elif "release_year" in entry["title"]:
-                                    entry["qualifiers"] = entry["title"]["release_year"]
-                                else:
-                                    console(f"[red bold] No year information in {entry['title'].keys()}")
-                                    return
-                                if "title" in entry["title"]:
-                                    entry["title"] = entry["title"]["title"]
-                                else:
-                                    console(f"[red bold] No title informatio nin {entry['title'].keys()}")
-                            if "qualifiers" not in entry:
-                                if "author" in entry:
-                                    if entry["author"]:
-                                        entry["qualifiers"] = [entry["author"]]
-                                    else:
-                                        entry["qualifiers"] = []
-                                    del entry["author"]
-                                if " by " in entry["title"]:
-                                    title, author = split_book_title_by_author(entry["title"])
-                                    entry["title"] = title
-                                    entry["qualifiers"] = [author]
-                            if isinstance(entry["qualifiers"], int):
-                                entry["qualifiers"] = [str(entry["qualifiers"])]
-                            elif isinstance(entry["qualifiers"], str):
-                                entry["qualifiers"] = [entry["qualifiers"]]
-                            elif isinstance(entry["qualifiers"], list):
-                                entry["qualifiers"] = [str(v) for v in entry["qualifiers"]]
-                            elif entry["qualifiers"] is None:
-                                entry["qualifiers"] = []
-                            else:
-                                console(
-                                    f"[red bold] Unsupported qualifiers type {entry['qualifiers'].__class__.__name__}"
-                                )
-                                return
-
-                with open(os.path.join("data", domain, f"{llm}_{data_set}.json"), "w") as out_f:
-                    json.dump(solutions, out_f)
+    run_fixes(["result_format"])
 
 
 @group.command()
 def ensure_only_valid_threads() -> None:
     """Ensure no duplicate threads or ignored threads are included."""
-    for domain in track(DOMAINS, description="Applying fixes"):
-        for llm in LLMS:
-            for data_set in DATA_SETS:
-                if not os.path.exists(os.path.join("data", domain, f"{llm}_{data_set}.json")):
-                    continue
-                with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-                    solutions = json.load(in_f)
-                with open(os.path.join("data", domain, f"ignored_{data_set}.txt")) as in_f:
-                    ignored = {line.strip() for line in in_f.readlines()}
-                with open(os.path.join("data", domain, f"solved_{data_set}.json")) as in_f:
-                    valid = set()
-                    for task in json.load(in_f):
-                        valid.add(task["thread_id"])
-
-                tmp = []
-                seen_ids = set()
-                for solution in solutions:
-                    if (
-                        solution["thread_id"] not in seen_ids
-                        and solution["thread_id"] not in ignored
-                        and solution["thread_id"] in valid
-                    ):
-                        tmp.append(solution)
-                        seen_ids.add(solution["thread_id"])
-                solutions = tmp
-
-                with open(os.path.join("data", domain, f"{llm}_{data_set}.json"), "w") as out_f:
-                    json.dump(solutions, out_f)
+    run_fixes(["valid_threads"])
 
 
 @group.command()
 def normalise_confidence() -> None:
     """Normalise the confidence values."""
-    for domain in track(DOMAINS, description="Applying fixes"):
-        for llm in LLMS:
-            for data_set in DATA_SETS:
-                with open(os.path.join("data", domain, f"{llm}_{data_set}.json")) as in_f:
-                    solutions = json.load(in_f)
-                    for solution in solutions:
-                        for result_list in solution["results"]:
-                            confidences = []
-                            for result in result_list:
-                                if "confidence" in result:
-                                    confidences.append(float(result["confidence"]))
-                            if len(confidences) > 0:
-                                if max(confidences) <= 1:
-                                    for result in result_list:
-                                        if "confidence" in result:
-                                            result["normalised_confidence"] = max(float(result["confidence"]), 0)
-                                elif max(confidences) <= 10:  # noqa: PLR2004
-                                    for result in result_list:
-                                        if "confidence" in result:
-                                            result["normalised_confidence"] = max(float(result["confidence"]) / 10.0, 0)
-                                elif max(confidences) <= 100:  # noqa: PLR2004
-                                    for result in result_list:
-                                        if "confidence" in result:
-                                            result["normalised_confidence"] = max(
-                                                float(result["confidence"]) / 100.0, 0
-                                            )
-                with open(os.path.join("data", domain, f"{llm}_{data_set}.json"), "w") as out_f:
-                    json.dump(solutions, out_f)
+    run_fixes(["confidence"])
 
 
 @group.command()
 def everything() -> None:
-    """Apply all fixes."""
-    ensure_only_valid_threads()
-    ensure_result_format()
-    normalise_confidence()
+    """Apply all fixes in a single pass over each result file."""
+    run_fixes(["valid_threads", "result_format", "confidence"])
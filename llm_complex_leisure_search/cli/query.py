@@ -0,0 +1,27 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""LLM query CLI commands."""
+
+from typing import Annotated
+
+from typer import Option
+
+
+def query(
+    domain: str,
+    backend: str,
+    data_set: Annotated[list[str] | None, Option(help="Data-set to query, defaults to all of the domain")] = None,
+    output_name: Annotated[str | None, Option(help="Result file prefix, defaults to the backend's")] = None,
+) -> None:
+    """Query an LLM backend (gemini, ollama, openai) for all solved threads of a domain."""
+    from llm_complex_leisure_search.query import run_query
+
+    run_query(domain, backend, data_set, output_name)
+
+
+def stub_server(host: str = "127.0.0.1", port: int = 8000) -> None:
+    """Run a stub OpenAI-compatible server that returns deterministic suggestions."""
+    from llm_complex_leisure_search.llms.stub import serve
+
+    serve(host, port)
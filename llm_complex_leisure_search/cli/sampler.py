@@ -2,86 +2,80 @@
 
 import os
 from csv import DictReader, DictWriter
-from random import choice, shuffle
+from typing import Annotated
 
-from numpy import array, average
+import numpy
+from rich import print as console
 from rich.progress import track
-from scipy.spatial.distance import cosine
-from typer import Typer
+from rich.table import Table
+from typer import Option, Typer
+
+from llm_complex_leisure_search.constants import DOMAINS
+from llm_complex_leisure_search.relevance import RelevanceMatrix, load_relevance_matrix, normalise_sparse_rows
+from llm_complex_leisure_search.sampling import OBJECTIVES, diverse_sample, diversity_scores
 
 group = Typer(name="sampler", help="Commands for data sampling")
 
 
-@group.command()
-def jdoc_relevance_first_post_sample() -> None:
-    """Create a sample of first posts based on the JDOC relevance assessments."""
-    vectors = {}
+def _domain_first_posts(domain: str, relevance: RelevanceMatrix) -> list[dict]:
+    """Load the first posts of a domain that have a non-zero relevance vector, each thread only once."""
+    entries = {}
+    for filename in ("extra", "jdoc"):
+        with open(os.path.join("data", domain, f"first-posts_{filename}.tsv")) as in_f:
+            reader = DictReader(in_f, delimiter="\t")
+            for line in reader:
+                if relevance.has_assessments(line["thread_id"]):
+                    entries.setdefault(line["thread_id"], line)
+    return list(entries.values())
 
-    with open(os.path.join("data", "jdoc-relevance-assessments.tsv")) as in_f:
-        reader = DictReader(in_f, delimiter="\t")
-        vector_fields = reader.fieldnames[5:]
-        for line in reader:
-            vec = []
-            for key in vector_fields:
-                try:
-                    vec.append(int(line[key]))
-                except ValueError:
-                    vec.append(0)
-            vectors[line["id"]] = array(vec, dtype=int)
 
+@group.command()
+def sample(
+    domain: Annotated[list[str] | None, Option(help="Domain to sample, defaults to all domains")] = None,
+    k: Annotated[int, Option(help="Number of first posts to sample per domain")] = 10,
+    restarts: Annotated[int, Option(help="Number of sampler restarts, the best sample is kept")] = 10,
+    seed: Annotated[int | None, Option(help="Seed for a reproducible sample")] = None,
+    objective: Annotated[str, Option(help=f"Diversity objective, one of {', '.join(OBJECTIVES)}")] = "average",
+    batch_size: Annotated[int | None, Option(help="Use the approximate sampler with batches of this size")] = None,
+    output: Annotated[str, Option(help="TSV file to write the sample to")] = os.path.join("data", "final-sample.tsv"),
+) -> None:
+    """Create a diverse sample of first posts based on the JDOC relevance assessments."""
+    domains = domain if domain else DOMAINS
+    relevance = load_relevance_matrix()
+    seeds = numpy.random.SeedSequence(seed).spawn(len(domains))
     final_sample = []
-    for domain in track(("books", "games", "movies"), description="Creating samples"):
-        entries = []
-        for filename in ("extra", "jdoc"):
-            with open(os.path.join("data", domain, f"first-posts_{filename}.tsv")) as in_f:
-                reader = DictReader(in_f, delimiter="\t")
-                for line in reader:
-                    if line["thread_id"] in vectors:
-                        entries.append(line)
-
-        final_selection = None
-        final_similarity = 2
-        for _ in range(0, 10):
-            selected = [choice(entries)]  # noqa: S311
-            while len(selected) < 10:  # noqa: PLR2004
-                shuffle(entries)
-                min_sim = 2
-                new_elem = None
-                for entry in entries:
-                    # Skip things already in the selected list
-                    found = False
-                    for previous in selected:
-                        if entry["thread_id"] == previous["thread_id"]:
-                            found = True
-                            break
-                    if found:
-                        continue
-                    # Calculate the similarity with all previously selected elements
-                    similarities = []
-                    for previous in selected:
-                        similarities.append(cosine(vectors[previous["thread_id"]], vectors[entry["thread_id"]]))
-                    avg_sim = average(similarities)
-                    # Update the selected element if less similar than the previous one
-                    if avg_sim < min_sim:
-                        new_elem = entry
-                        min_sim = avg_sim
-                # Add the new element to the list of selected elements
-                selected.append(new_elem)
-
-            similarities = []
-            for entry_a in selected:
-                for entry_b in selected:
-                    if entry_a["thread_id"] == entry_b["thread_id"]:
-                        continue
-                    similarities.append(cosine(vectors[entry_a["thread_id"]], vectors[entry_b["thread_id"]]))
-            avg_sim = average(similarities)
-            if avg_sim < final_similarity:
-                final_selection = selected
-                final_similarity = avg_sim
-        final_sample.extend(final_selection)
+    table = Table("Domain", "Sample size", f"Score ({objective})", "Average similarity", "Minimum distance")
+    for domain_name, domain_seed in track(
+        zip(domains, seeds, strict=True), total=len(domains), description="Creating samples"
+    ):
+        entries = _domain_first_posts(domain_name, relevance)
+        matrix = normalise_sparse_rows(relevance.rows([entry["thread_id"] for entry in entries])).toarray()
+        selected, score = diverse_sample(
+            matrix, k, restarts=restarts, seed=domain_seed, objective=objective, batch_size=batch_size
+        )
+        final_sample.extend(entries[idx] for idx in selected)
+        scores = diversity_scores(matrix, selected)
+        table.add_row(
+            domain_name,
+            str(len(selected)),
+            f"{score:.4f}",
+            f"{scores['similarity.average']:.4f}",
+            f"{scores['distance.min']:.4f}",
+        )
+    console(table)
 
-    with open(os.path.join("data", "final-sample.tsv"), "w") as out_f:
+    with open(output, "w") as out_f:
         writer = DictWriter(out_f, ["thread_id", "domain", "type", "source", "request"], delimiter="\t")
         writer.writeheader()
         for entry in final_sample:
             writer.writerow(entry)
+
+
+@group.command()
+def jdoc_relevance_first_post_sample(k: int = 10, restarts: int = 10, seed: int | None = None) -> None:
+    """Create a sample of first posts based on the JDOC relevance assessments.
+
+    For each domain, `k` first posts are selected that have the lowest average cosine similarity of their relevance
+    vectors, taking the best of `restarts` greedy runs. Use the `sample` command for the other objectives.
+    """
+    sample(domain=None, k=k, restarts=restarts, seed=seed)
@@ -6,3 +6,8 @@
 DOMAINS = ["books", "games", "movies"]
 LLMS = ["gemini", "gpt-3-5", "gpt-4o-mini", "llama-3-2"]
 DATA_SETS = ["extra", "jdoc"]
+ANNOTATION_DATA_SETS = {
+    "books": ["jdoc", "extra", "goodreads"],
+    "games": ["jdoc", "extra"],
+    "movies": ["jdoc", "extra"],
+}
@@ -0,0 +1,60 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Domain-independent extraction of the solved threads from the annotated posts."""
+
+import os
+from collections.abc import Callable, Iterable, Iterator
+from csv import DictReader
+
+from rich.progress import track
+
+
+def read_first_posts(domain: str, data_set: str) -> list[dict]:
+    """Read the first posts of all threads in a data-set."""
+    with open(os.path.join("data", domain, f"first-posts_{data_set}.tsv")) as in_f:
+        return list(DictReader(in_f, delimiter="\t"))
+
+
+def read_ignored(domain: str, data_set: str) -> set[str]:
+    """Read the set of ignored thread_ids of a data-set."""
+    with open(os.path.join("data", domain, f"ignored_{data_set}.txt")) as in_f:
+        return {thread_id.strip() for thread_id in in_f if thread_id.strip()}
+
+
+def stream_posts(domain: str, data_set: str) -> Iterator[dict]:
+    """Stream the annotated posts of a data-set."""
+    with open(os.path.join("data", domain, f"posts_{data_set}.csv")) as in_f:
+        yield from DictReader(in_f)
+
+
+def group_posts(posts: Iterable[dict]) -> dict[str, list[dict]]:
+    """Group the posts by their thread_id in a single pass, keeping the order of the posts within each thread."""
+    threads = {}
+    for post in posts:
+        threads.setdefault(post["thread_id"], []).append(post)
+    return threads
+
+
+def extract_threads(
+    first_posts: list[dict],
+    posts: Iterable[dict],
+    ignored_ids: Iterable[str],
+    parse_solution: Callable[[dict, list[dict]], dict | None],
+) -> list[dict]:
+    """Extract the solved threads.
+
+    The `posts` are grouped by thread_id in one pass. Then, for every first post that is not ignored,
+    `parse_solution` is called with the first post and the posts of its thread. It returns the domain-specific
+    solution or `None` if the thread is not included.
+    """
+    ignored_ids = set(ignored_ids)
+    threads = group_posts(posts)
+    solved = []
+    for first_post in track(first_posts, description="Finding solutions"):
+        if first_post["thread_id"] in ignored_ids:
+            continue
+        solution = parse_solution(first_post, threads.get(first_post["thread_id"], []))
+        if solution is not None:
+            solved.append(solution)
+    return solved
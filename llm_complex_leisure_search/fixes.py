@@ -0,0 +1,212 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Single-pass fixes for the LLM result files."""
+
+import json
+import math
+import os
+from collections import Counter
+from collections.abc import Callable
+
+import numpy
+
+from llm_complex_leisure_search.util import split_book_title_by_author
+
+TITLE_KEYS = ("Title", "bookTitle", "answer", "name", "text", "game", "suggestion", "question")
+QUALIFIER_KEYS = ("author", "year", "release_year", "releaseYear", "release year")
+CONFIDENCE_LABELS = {"very high": 0.9, "high": 0.75, "medium": 0.5, "moderate": 0.5, "low": 0.25, "very low": 0.1}
+FIX_NAMES = ("valid_threads", "result_format", "confidence")
+
+
+class FixError(Exception):
+    """Error indicating that a result file cannot be fixed automatically."""
+
+
+def fix_valid_threads(solutions: list[dict], domain: str, data_set: str, counters: Counter) -> list[dict]:
+    """Remove duplicate threads, ignored threads, and threads that are not in the solved threads."""
+    with open(os.path.join("data", domain, f"ignored_{data_set}.txt")) as in_f:
+        ignored = {line.strip() for line in in_f}
+    with open(os.path.join("data", domain, f"solved_{data_set}.json")) as in_f:
+        valid = {task["thread_id"] for task in json.load(in_f)} - ignored
+    fixed = []
+    for solution in solutions:
+        if solution["thread_id"] in valid:
+            fixed.append(solution)
+            valid.discard(solution["thread_id"])
+    counters["threads removed"] += len(solutions) - len(fixed)
+    return fixed
+
+
+def _normalise_answer(entry: dict) -> None:
+    """Set the `title` and `qualifiers` of an entry that only has a list or dict `answer`."""
+    answer = entry["answer"]
+    if isinstance(answer, list):
+        entry["title"] = answer[0]
+        entry["qualifiers"] = answer[1:]
+    elif isinstance(answer, dict):
+        entry["title"] = next((answer[key] for key in TITLE_KEYS if key in answer), next(iter(answer.keys())))
+        if "Author" in answer:
+            entry["qualifiers"] = answer["Author"]
+        else:
+            entry["qualifiers"] = next(
+                ([answer[key]] for key in QUALIFIER_KEYS if key in answer), next(iter(answer.values()))
+            )
+    else:
+        msg = f"No title in {entry}"
+        raise FixError(msg)
+
+
+def _normalise_entry(entry: dict, counters: Counter) -> None:
+    """Normalise a single entry to a `title` and a list of string `qualifiers`."""
+    if "title" not in entry:
+        _normalise_answer(entry)
+    if isinstance(entry["title"], dict):
+        if "year" in entry["title"]:
+            entry["qualifiers"] = entry["title"]["year"]
+        elif "release_year" in entry["title"]:
+            entry["qualifiers"] = entry["title"]["release_year"]
+        else:
+            msg = f"No year information in {entry['title'].keys()}"
+            raise FixError(msg)
+        if "title" in entry["title"]:
+            entry["title"] = entry["title"]["title"]
+        else:
+            counters["titles without title information"] += 1
+    if "qualifiers" not in entry:
+        if "author" in entry:
+            entry["qualifiers"] = [entry["author"]] if entry["author"] else []
+            del entry["author"]
+        if " by " in entry["title"]:
+            title, author = split_book_title_by_author(entry["title"])
+            entry["title"] = title
+            entry["qualifiers"] = [author]
+    if "qualifiers" not in entry:
+        msg = f"No qualifiers in {entry}"
+        raise FixError(msg)
+    qualifiers = entry["qualifiers"]
+    if isinstance(qualifiers, int):
+        entry["qualifiers"] = [str(qualifiers)]
+    elif isinstance(qualifiers, str):
+        entry["qualifiers"] = [qualifiers]
+    elif isinstance(qualifiers, list):
+        entry["qualifiers"] = [str(v) for v in qualifiers]
+    elif qualifiers is None:
+        entry["qualifiers"] = []
+    else:
+        msg = f"Unsupported qualifiers type {qualifiers.__class__.__name__}"
+        raise FixError(msg)
+
+
+def fix_result_format(solutions: list[dict], domain: str, data_set: str, counters: Counter) -> list[dict]:  # noqa: ARG001
+    """Remove entries without an answer and normalise all entries to a `title` and a list of `qualifiers`."""
+    for solution in solutions:
+        results = []
+        for result_set in solution["results"]:
+            entries = [entry for entry in result_set if entry["answer"]]
+            counters["entries removed"] += len(result_set) - len(entries)
+            for entry in entries:
+                before = (entry.get("title"), entry.get("qualifiers"))
+                _normalise_entry(entry, counters)
+                if (entry["title"], entry["qualifiers"]) != before:
+                    counters["entries reformatted"] += 1
+            results.append(entries)
+        solution["results"] = results
+    return solutions
+
+
+def confidence_value(value: object) -> tuple[float, bool]:
+    """Convert a raw confidence into a `(value, explicit)` tuple.
+
+    Numbers and numeric strings are returned as they are, with the scale detected per run. Percentage strings and
+    :data:`CONFIDENCE_LABELS` have an explicit scale and are returned normalised to the range 0 to 1. Values that cannot
+    be converted are returned as NaN.
+    """
+    if isinstance(value, int | float):
+        return (float(value), False)
+    elif isinstance(value, str):
+        value = value.strip().lower()
+        if value.endswith("%"):
+            try:
+                return (float(value[:-1]) / 100.0, True)
+            except ValueError:
+                return (math.nan, False)
+        try:
+            return (float(value), False)
+        except ValueError:
+            return (CONFIDENCE_LABELS.get(value, math.nan), value in CONFIDENCE_LABELS)
+    return (math.nan, False)
+
+
+def fix_confidence(solutions: list[dict], domain: str, data_set: str, counters: Counter) -> list[dict]:  # noqa: ARG001
+    """Add the `normalised_confidence` in the range 0 to 1.
+
+    All confidences are flattened into a single array with one segment per run. The scale of the numeric confidences
+    (1, 10, or 100) is detected from the maximum of each run, which is calculated with :func:`numpy.maximum.reduceat`.
+    Runs whose maximum exceeds 100 are not normalised.
+    """
+    entries = []
+    raw = []
+    run_lengths = []
+    for solution in solutions:
+        for result_list in solution["results"]:
+            length = 0
+            for result in result_list:
+                if "confidence" in result:
+                    entries.append(result)
+                    raw.append(confidence_value(result["confidence"]))
+                    length = length + 1
+            run_lengths.append(length)
+    if len(entries) == 0:
+        return solutions
+    values = numpy.array([value for value, _ in raw], dtype=numpy.float64)
+    explicit = numpy.array([is_explicit for _, is_explicit in raw], dtype=bool)
+    run_lengths = numpy.array(run_lengths, dtype=numpy.int64)
+    run_lengths = run_lengths[run_lengths > 0]
+    run_starts = numpy.cumsum(run_lengths) - run_lengths
+    with numpy.errstate(invalid="ignore"):
+        run_max = numpy.maximum.reduceat(numpy.where(explicit | numpy.isnan(values), -numpy.inf, values), run_starts)
+    run_scale = numpy.select(
+        [run_max <= 1, run_max <= 10, run_max <= 100],  # noqa: PLR2004
+        [1.0, 10.0, 100.0],
+        numpy.nan,
+    )
+    scale = numpy.repeat(run_scale, run_lengths)
+    normalised = numpy.maximum(numpy.where(explicit, values, values / scale), 0)
+    counters["confidences not converted"] += int(numpy.isnan(values).sum())
+    for entry, value in zip(entries, normalised.tolist(), strict=True):
+        if not math.isnan(value) and entry.get("normalised_confidence") != value:
+            entry["normalised_confidence"] = value
+            counters["confidences normalised"] += 1
+    return solutions
+
+
+FIXES: dict[str, Callable[[list[dict], str, str, Counter], list[dict]]] = {
+    "valid_threads": fix_valid_threads,
+    "result_format": fix_result_format,
+    "confidence": fix_confidence,
+}
+
+
+def apply_fixes(domain: str, llm: str, data_set: str, fixes: list[str]) -> Counter:
+    """Apply the `fixes` to a single result file, in the order of :data:`FIX_NAMES`, with one load and save.
+
+    The file is only rewritten if the serialised fixed data differs from the file's content, so that unchanged files
+    keep their modification time and the analysis caches that are keyed on their digest stay valid.
+    """
+    path = os.path.join("data", domain, f"{llm}_{data_set}.json")
+    counters = Counter()
+    with open(path, "rb") as in_f:
+        source = in_f.read()
+    solutions = json.loads(source)
+    for name in FIX_NAMES:
+        if name in fixes:
+            solutions = FIXES[name](solutions, domain, data_set, counters)
+    fixed = json.dumps(solutions).encode()
+    if fixed != source:
+        with open(path, "wb") as out_f:
+            out_f.write(fixed)
+        counters["files rewritten"] += 1
+    else:
+        counters["files unchanged"] += 1
+    return counters
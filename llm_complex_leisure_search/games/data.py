@@ -3,10 +3,14 @@
 # SPDX-License-Identifier: MIT
 """Data extraction functionality for games."""
 
-from rich.progress import track
+import json
+import os
+from collections.abc import Iterable
 
-from llm_complex_leisure_search.games.igdb import get_game
+from llm_complex_leisure_search.extraction import extract_threads
+from llm_complex_leisure_search.games.igdb import default_client
 
+RELEASE_YEARS_FILE = os.path.join("data", "games", "release-years.json")
 PROMPT_TEMPLATE = """Identify the game the user is looking for as described in the request below:
 
 Request: "{request}"
@@ -14,30 +18,51 @@ Request: "{request}"
 Please provide a ranked list of your 20 best guesses for the correct answer. Please answer in a JSON object that contains a ranked list of suggestions. Each suggestion should contain a field called 'answer' containing the suggestion (title and release year), a field 'explanation' containing an explanation of why these games could be the correct answer, and a 'confidence' score that represents how confident you are of your suggestion."""  # noqa: E501
 
 
-def extract_solved_threads(first_posts: list[dict], posts: list[dict], ignored_ids: list[str]) -> list[dict]:
+def parse_solution(first_post: dict, posts: list[dict]) -> dict | None:
+    """Parse the solution of a single thread from its posts, returning `None` if it has no IGDB identifier."""
+    solution = {
+        "thread_id": first_post["thread_id"],
+        "request": first_post["request"],
+        "prompt": PROMPT_TEMPLATE.format(request=first_post["request"]),
+        "title": None,
+        "years": [],
+        "igdb_id": None,
+    }
+    for post in posts:
+        if post["solved"] == "solved" or post["solved"] == "solved / confirmed":
+            solution["title"] = post["answer"]
+            solution["igdb_id"] = post["IGDB_id"]
+    if solution["igdb_id"] is not None:
+        return solution
+    return None
+
+
+def extract_solved_threads(first_posts: list[dict], posts: Iterable[dict], ignored_ids: Iterable[str]) -> list[dict]:
     """Extract all solved threads from a list of posts."""
-    solved = []
-    for first_post in track(first_posts, description="Finding solutions"):
-        if first_post["thread_id"] in ignored_ids:
-            continue
-        solution = {
-            "thread_id": first_post["thread_id"],
-            "request": first_post["request"],
-            "prompt": PROMPT_TEMPLATE.format(request=first_post["request"]),
-            "title": None,
-            "years": [],
-            "igdb_id": None,
-        }
-        for post in posts:
-            if post["thread_id"] != first_post["thread_id"]:
-                continue
-            if post["solved"] == "solved" or post["solved"] == "solved / confirmed":
-                solution["title"] = post["answer"]
-                solution["igdb_id"] = post["IGDB_id"]
-
-        if solution["igdb_id"] is not None:
-            solved.append(solution)
-    for solution in track(solved, description="Add publication years"):
-        game = get_game(solution["igdb_id"])
-        solution["years"] = game["release_years"]
+    solved = extract_threads(first_posts, posts, ignored_ids, parse_solution)
+    add_release_years(solved)
     return solved
+
+
+def add_release_years(solved: list[dict]) -> None:
+    """Add the release years of the solution games to the solved threads.
+
+    Release years are stored per igdb_id in :data:`RELEASE_YEARS_FILE` and only the games that are not in that file
+    are fetched from the IGDB, using batched queries. Threads whose game is not found get an empty list of years, which
+    is also stored, so that games that are not found are not fetched again.
+    """
+    if os.path.exists(RELEASE_YEARS_FILE):
+        with open(RELEASE_YEARS_FILE) as in_f:
+            release_years = json.load(in_f)
+    else:
+        release_years = {}
+    igdb_ids = [solution["igdb_id"].strip() for solution in solved]
+    missing = list(dict.fromkeys(igdb_id for igdb_id in igdb_ids if igdb_id and igdb_id not in release_years))
+    if len(missing) > 0:
+        games = default_client().get_games(missing)
+        for igdb_id in missing:
+            release_years[igdb_id] = games[igdb_id]["release_years"] if igdb_id in games else []
+        with open(RELEASE_YEARS_FILE, "w") as out_f:
+            json.dump(release_years, out_f, sort_keys=True)
+    for solution, igdb_id in zip(solved, igdb_ids, strict=True):
+        solution["years"] = release_years.get(igdb_id, [])
@@ -4,12 +4,20 @@
 """IGDB API functions."""
 
 from enum import Enum
-from time import sleep
+from functools import lru_cache
+from threading import Lock
+from time import monotonic, sleep
 
 from httpx import Client
 
+from llm_complex_leisure_search.cache import CacheMissError, response_cache
 from llm_complex_leisure_search.settings import settings
 
+GAME_FIELDS = "id,name,release_dates,url,parent_game,rating,rating_count"
+QUERY_LIMIT = 500
+MULTIQUERY_LIMIT = 10
+REQUEST_INTERVAL = 0.3
+
 
 class SearchMode(str, Enum):
     """Search modes."""
@@ -18,93 +26,216 @@ class SearchMode(str, Enum):
     EXACT = "exact"
 
 
-def get_game(game_id: str) -> dict | None:
-    """Fetch the data for a single game."""
-    sleep(0.3)
-    with Client(timeout=30) as client:
-        response = client.post(
-            "https://id.twitch.tv/oauth2/token",
-            params=[
-                ("client_id", settings.igdb.client_id),
-                ("client_secret", settings.igdb.client_secret),
-                ("grant_type", "client_credentials"),
+def _quote(value: str) -> str:
+    """Quote a string for use in an IGDB query."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class IGDBClient:
+    """Client for the IGDB API.
+
+    The client keeps a single connection pool open and caches the Twitch access token until shortly before it
+    expires. Release years are fetched for all games in a response with a single `/release_dates` query and multiple
+    names can be searched in one request via the `/multiquery` endpoint. Requests are spaced at least
+    :data:`REQUEST_INTERVAL` seconds apart, also when the client is shared between threads. Games and search results
+    are stored in the shared :class:`~llm_complex_leisure_search.cache.ResponseCache` and are only fetched if they are
+    not cached.
+    """
+
+    def __init__(self):
+        """Initialise the client."""
+        self._client = Client(timeout=30)
+        self._access_token = None
+        self._token_expires = 0
+        self._last_request = 0
+        self._token_lock = Lock()
+        self._request_lock = Lock()
+
+    def _token(self) -> str:
+        """Return the access token, fetching a new one if the cached one has expired."""
+        with self._token_lock:
+            if self._access_token is None or monotonic() >= self._token_expires:
+                response = self._client.post(
+                    "https://id.twitch.tv/oauth2/token",
+                    params=[
+                        ("client_id", settings.igdb.client_id),
+                        ("client_secret", settings.igdb.client_secret),
+                        ("grant_type", "client_credentials"),
+                    ],
+                )
+                response.raise_for_status()
+                auth_data = response.json()
+                self._access_token = auth_data["access_token"]
+                self._token_expires = monotonic() + max(auth_data.get("expires_in", 0) - 60, 0)
+            return self._access_token
+
+    def _query(self, endpoint: str, query: str) -> list[dict]:
+        """Send a single query to an IGDB endpoint."""
+        with self._request_lock:
+            slot = max(monotonic(), self._last_request + REQUEST_INTERVAL)
+            self._last_request = slot
+        delay = slot - monotonic()
+        if delay > 0:
+            sleep(delay)
+        response = self._client.post(
+            f"https://api.igdb.com/v4/{endpoint}",
+            headers=[
+                ("Client-ID", settings.igdb.client_id),
+                ("Authorization", f"Bearer {self._token()}"),
+                ("Accept", "application/json"),
             ],
+            data=query,
         )
-        if response.status_code == 200:  # noqa: PLR2004
-            auth_data = response.json()
-            response = client.post(
-                "https://api.igdb.com/v4/games",
-                headers=[
-                    ("Client-ID", settings.igdb.client_id),
-                    ("Authorization", f"Bearer {auth_data['access_token']}"),
-                    ("Accept", "application/json"),
-                ],
-                data=f"fields id,name,release_dates,url,parent_game;limit 100;where id = {game_id};",
+        response.raise_for_status()
+        return response.json()
+
+    def _add_release_years(self, games: list[dict]) -> None:
+        """Add the `release_years` to all games, fetching the release dates of all games in batched queries."""
+        date_ids = sorted({date_id for game in games for date_id in game.get("release_dates", [])})
+        years = {}
+        for start in range(0, len(date_ids), QUERY_LIMIT):
+            chunk = date_ids[start : start + QUERY_LIMIT]
+            for date in self._query(
+                "release_dates",
+                f"fields id,y;limit {QUERY_LIMIT};where id = ({','.join([str(v) for v in chunk])});",
+            ):
+                if "y" in date:
+                    years[date["id"]] = date["y"]
+        for game in games:
+            game["release_years"] = list(
+                {years[date_id] for date_id in game.get("release_dates", []) if date_id in years}
             )
-            results = response.json()
-            for entry in results:
-                if "release_dates" in entry:
-                    sleep(0.3)
-                    response = client.post(
-                        "https://api.igdb.com/v4/release_dates",
-                        headers=[
-                            ("Client-ID", settings.igdb.client_id),
-                            ("Authorization", f"Bearer {auth_data['access_token']}"),
-                            ("Accept", "application/json"),
-                        ],
-                        data=f"fields y;limit 100;where id = ({','.join([str(v) for v in entry['release_dates']])});",
-                    )
-                    dates = response.json()
-                    entry["release_years"] = list({date["y"] for date in dates if "y" in date})
-                else:
-                    entry["release_years"] = []
-            if len(results) == 1:
-                return results[0]
-    return None
 
+    def get_games(self, game_ids: list[str]) -> dict[str, dict]:
+        """Fetch the data for multiple games, returning a dictionary keyed by the game ids.
 
-def search(name: str, search_mode: SearchMode = SearchMode.DEFAULT) -> list[dict]:
-    """Search the IGDB API by name."""
-    with Client(timeout=30) as client:
-        response = client.post(
-            "https://id.twitch.tv/oauth2/token",
-            params=[
-                ("client_id", settings.igdb.client_id),
-                ("client_secret", settings.igdb.client_secret),
-                ("grant_type", "client_credentials"),
-            ],
-        )
-        if response.status_code == 200:  # noqa: PLR2004
-            auth_data = response.json()
-            response = client.post(
-                "https://api.igdb.com/v4/games",
-                headers=[
-                    ("Client-ID", settings.igdb.client_id),
-                    ("Authorization", f"Bearer {auth_data['access_token']}"),
-                    ("Accept", "application/json"),
-                ],
-                data=f'fields id,name,release_dates,url,parent_game,rating,rating_count;limit 100;search "{name}";',
+        Games that are in the response cache are not fetched again.
+        """
+        cache = response_cache()
+        games = {}
+        missing = []
+        for game_id in dict.fromkeys(str(game_id).strip() for game_id in game_ids):
+            found, game = cache.get("igdb.game", game_id)
+            if found:
+                games[game_id] = game
+            else:
+                missing.append(game_id)
+        if len(missing) > 0 and cache.offline:
+            msg = f"No cached igdb.game response for {missing[0]!r}"
+            raise CacheMissError(msg)
+        fetched = []
+        for start in range(0, len(missing), QUERY_LIMIT):
+            chunk = missing[start : start + QUERY_LIMIT]
+            fetched.extend(
+                self._query("games", f"fields {GAME_FIELDS};limit {QUERY_LIMIT};where id = ({','.join(chunk)});")
+            )
+        self._add_release_years(fetched)
+        for game in fetched:
+            cache.set("igdb.game", str(game["id"]), game)
+            games[str(game["id"])] = game
+        return games
+
+    def get_game(self, game_id: str) -> dict | None:
+        """Fetch the data for a single game."""
+        return self.get_games([game_id]).get(str(game_id).strip())
+
+    def search_many(self, names: list[str], search_mode: SearchMode = SearchMode.DEFAULT) -> list[list[dict]]:
+        """Search the IGDB API for multiple names, returning one list of games for each name.
+
+        Names that are in the response cache are not searched for again.
+        """
+        cache = response_cache()
+        results = {}
+        missing = []
+        for name in names:
+            found, games = cache.get("igdb.search", name)
+            if found:
+                results[name] = games
+            elif name not in missing:
+                missing.append(name)
+        if len(missing) > 0 and cache.offline:
+            msg = f"No cached igdb.search response for {missing[0]!r}"
+            raise CacheMissError(msg)
+        for start in range(0, len(missing), MULTIQUERY_LIMIT):
+            chunk = missing[start : start + MULTIQUERY_LIMIT]
+            response = self._query(
+                "multiquery",
+                "".join(
+                    f'query games "{idx}" {{fields {GAME_FIELDS};limit 100;search {_quote(name)};}};'
+                    for idx, name in enumerate(chunk)
+                ),
             )
-            results = response.json()
-            if search_mode == SearchMode.EXACT:
-                results = [
-                    entry for entry in results if name == entry["name"] or name.replace(" and ", " & ") == entry["name"]
+            chunk_results = [[] for _ in chunk]
+            for query_result in response:
+                chunk_results[int(query_result["name"])] = query_result["result"]
+            self._add_release_years([game for games in chunk_results for game in games])
+            for name, games in zip(chunk, chunk_results, strict=True):
+                cache.set("igdb.search", name, games)
+                results[name] = games
+        if search_mode == SearchMode.EXACT:
+            return [
+                [
+                    entry
+                    for entry in results[name]
+                    if name == entry["name"] or name.replace(" and ", " & ") == entry["name"]
                 ]
-            for entry in results:
-                if "release_dates" in entry:
-                    sleep(0.3)
-                    response = client.post(
-                        "https://api.igdb.com/v4/release_dates",
-                        headers=[
-                            ("Client-ID", settings.igdb.client_id),
-                            ("Authorization", f"Bearer {auth_data['access_token']}"),
-                            ("Accept", "application/json"),
-                        ],
-                        data=f"fields y;limit 100;where id = ({','.join([str(v) for v in entry['release_dates']])});",
-                    )
-                    dates = response.json()
-                    entry["release_years"] = list({date["y"] for date in dates if "y" in date})
-                else:
-                    entry["release_years"] = []
-            return results
-        return []
+                for name in names
+            ]
+        return [results[name] for name in names]
+
+    def search(self, name: str, search_mode: SearchMode = SearchMode.DEFAULT) -> list[dict]:
+        """Search the IGDB API by name."""
+        return self.search_many([name], search_mode)[0]
+
+    def close(self) -> None:
+        """Close the connection pool."""
+        self._client.close()
+
+    def __enter__(self) -> "IGDBClient":
+        """Enter the client's context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close the client when leaving the context."""
+        self.close()
+
+
+@lru_cache(maxsize=1)
+def default_client() -> IGDBClient:
+    """Return the shared :class:`IGDBClient`."""
+    return IGDBClient()
+
+
+def get_game(game_id: str) -> dict | None:
+    """Fetch the data for a single game."""
+    return default_client().get_game(game_id)
+
+
+def search(name: str, search_mode: SearchMode = SearchMode.DEFAULT) -> list[dict]:
+    """Search the IGDB API by name."""
+    return default_client().search(name, search_mode)
+
+
+def check_answers(answers: list[dict]) -> list[dict]:
+    """Check whether the game answers exist in the IGDB, searching for all answers in a single multiquery."""
+    results = []
+    for answer, games in zip(
+        answers,
+        default_client().search_many([answer["answer"][0] for answer in answers], SearchMode.EXACT),
+        strict=True,
+    ):
+        result = {
+            "exists": answer["exists"],
+            "exists_with_qualifier": answer["exists_with_qualifier"],
+            "popularity": answer["popularity"],
+        }
+        if len(games) > 0:
+            result["exists"] = True
+            result["popularity"] = sum([g["rating_count"] for g in games if "rating_count" in g]) / len(games)
+        for qualifier in answer["answer"][1]:
+            for game in games:
+                if qualifier in [str(v) for v in game["release_years"]]:
+                    result["exists_with_qualifier"] = True
+                    result["popularity"] = game["rating_count"] if "rating_count" in game else 0
+        results.append(result)
+    return results
@@ -3,53 +3,129 @@
 # SPDX-License-Identifier: MIT
 """Gemini API functions."""
 
-import json
-from time import sleep
+from functools import lru_cache
 
 import google.generativeai as genai
+from google.api_core.exceptions import InvalidArgument, ServerError, TooManyRequests
 
+from llm_complex_leisure_search.llms import (
+    LLMSession,
+    TransientLLMError,
+    parse_suggestions,
+    streamed_suggestions,
+    suggestions_complete,
+)
 from llm_complex_leisure_search.settings import settings
-from llm_complex_leisure_search.util import extract_json
+from llm_complex_leisure_search.util import IncrementalJSONListParser
 
 
-def generate_multiple_responses(prompt: str) -> list[dict | None]:
+def _close_stream(response: genai.types.GenerateContentResponse) -> None:
+    """Cancel the gRPC stream underlying a streamed response, if it is still open.
+
+    The response object has no public method for this, so the stream iterator that google-generativeai 0.7.2 keeps in
+    the private `_iterator` attribute is cancelled directly. The version is pinned for this reason. If the attribute
+    is missing or cannot be cancelled, the stream is left open and is closed when the response is garbage-collected,
+    in which case the generation is not stopped early.
+    """
+    stream = getattr(response, "_iterator", None)
+    if stream is not None:
+        if hasattr(stream, "cancel"):
+            stream.cancel()
+        elif hasattr(stream, "close"):
+            stream.close()
+
+
+class GeminiSession(LLMSession):
+    """Session with the Gemini API, holding the configured model handle."""
+
+    def __init__(self):
+        """Configure the API and create the model handle."""
+        genai.configure(api_key=settings.gemini.api_key)
+        self._model = genai.GenerativeModel(settings.gemini.model)
+        self.max_candidates = max(settings.gemini.candidate_count, 1)
+
+    def _generation_config(self, count: int) -> genai.GenerationConfig:
+        """Create the generation configuration for `count` candidates, limited to the `token_budget`."""
+        if settings.llm.token_budget > 0:
+            return genai.GenerationConfig(candidate_count=count, max_output_tokens=settings.llm.token_budget)
+        return genai.GenerationConfig(candidate_count=count)
+
+    def _generate_streamed(self, prompt: str, count: int) -> list[list[dict] | None]:
+        """Generate `count` responses for the prompt, parsing the suggestions while they are streamed.
+
+        Reading from the stream stops as soon as the lists of all candidates are complete and the stream is then
+        cancelled, which stops the generation.
+        """
+        parsers = [IncrementalJSONListParser() for _ in range(0, count)]
+        response = self._model.generate_content(prompt, generation_config=self._generation_config(count), stream=True)
+        try:
+            for chunk in response:
+                for candidate in chunk.candidates:
+                    if candidate.index < count and not suggestions_complete(parsers[candidate.index]):
+                        try:
+                            parsers[candidate.index].feed("".join(part.text for part in candidate.content.parts))
+                        except (AttributeError, ValueError):
+                            continue
+                if all(suggestions_complete(parser) for parser in parsers):
+                    break
+        finally:
+            _close_stream(response)
+        return [streamed_suggestions(parser) for parser in parsers]
+
+    def generate_single(self, prompt: str) -> list[dict] | None:
+        """Generate single response for the prompt using Gemini.
+
+        Requests are not rate-limited here, use the :class:`~llm_complex_leisure_search.llms.runner.QueryRunner` for
+        that. Empty or blocked responses, rate limits, and server errors are raised as :class:`TransientLLMError`, so
+        that the request is retried after a backoff.
+        """
+        try:
+            if settings.llm.streaming:
+                return self._generate_streamed(prompt, 1)[0]
+            response = self._model.generate_content(prompt, generation_config=self._generation_config(1))
+            return parse_suggestions(response.text)
+        except ValueError as e:
+            msg = f"No text in the response: {e}"
+            raise TransientLLMError(msg) from e
+        except (ServerError, TooManyRequests) as e:
+            raise TransientLLMError(str(e)) from e
+
+    def generate_candidates(self, prompt: str, count: int) -> list[list[dict] | None]:
+        """Generate `count` responses for the prompt with a single request, using Gemini's `candidate_count`.
+
+        If the model does not support multiple candidates, the session falls back to one candidate per request.
+        """
+        if count == 1 or self.max_candidates == 1:
+            return super().generate_candidates(prompt, count)
+        try:
+            if settings.llm.streaming:
+                return self._generate_streamed(prompt, count)
+            response = self._model.generate_content(prompt, generation_config=self._generation_config(count))
+        except InvalidArgument:
+            self.max_candidates = 1
+            return super().generate_candidates(prompt, count)
+        except (ServerError, TooManyRequests) as e:
+            raise TransientLLMError(str(e)) from e
+        results = []
+        for candidate in response.candidates[:count]:
+            try:
+                results.append(parse_suggestions("".join(part.text for part in candidate.content.parts)))
+            except (AttributeError, ValueError):
+                results.append(None)
+        return results + [None] * (count - len(results))
+
+
+@lru_cache(maxsize=1)
+def session() -> GeminiSession:
+    """Return the process-wide :class:`GeminiSession`."""
+    return GeminiSession()
+
+
+def generate_multiple_responses(prompt: str) -> list[list[dict]]:
     """Generate multiple responses for a prompt using Gemini."""
-    results = []
-    for _ in range(0, settings.llm.max_attempts):
-        result = generate_single_response(prompt)
-        if result is not None:
-            results.append(result)
-        if len(results) >= settings.llm.retest_target:
-            break
-    return results
+    return session().generate(prompt, settings.llm.retest_target)
 
 
-def generate_single_response(prompt: str) -> dict | None:
+def generate_single_response(prompt: str) -> list[dict] | None:
     """Generate single response for the prompt using Gemini."""
-    sleep(2)
-    genai.configure(api_key=settings.gemini.api_key)
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    try:
-        response = model.generate_content(prompt)
-        text = response.text
-        if "[" in text and "]" in text:
-            try:
-                return json.loads(extract_json(text))
-            except json.JSONDecodeError:
-                with open("invalid_json.txt", "+a") as out_f:
-                    out_f.write("----------------------\n")
-                    out_f.write("Invalid JSON extracted\n")
-                    out_f.write("----------------------\n")
-                    out_f.write(extract_json(text))
-                return None
-            except Exception:
-                with open("invalid_json.txt", "+a") as out_f:
-                    out_f.write("-----------------------\n")
-                    out_f.write("Invalid JSON identified\n")
-                    out_f.write("-----------------------\n")
-                    out_f.write(text)
-                return None
-    except ValueError:
-        sleep(60)
-        return None
-    return None
+    return session().generate_single(prompt)
@@ -2,3 +2,124 @@
 #
 # SPDX-License-Identifier: MIT
 """LLM implementations."""
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_complex_leisure_search.settings import settings
+from llm_complex_leisure_search.util import IncrementalJSONListParser, JSONExtractionError, parse_json_list
+
+
+class TransientLLMError(Exception):
+    """Error indicating a failed request that may succeed if it is retried later.
+
+    Sessions raise it for network errors, rate limits, server errors, and empty responses. The
+    :class:`~llm_complex_leisure_search.llms.runner.QueryRunner` retries such requests with a backoff, while all other
+    errors fail the request immediately.
+    """
+
+
+def _log_invalid_json(heading: str, text: str) -> None:
+    """Log a text from which no valid suggestions could be parsed to `invalid_json.txt`."""
+    with open("invalid_json.txt", "+a") as out_f:
+        out_f.write(f"{'-' * len(heading)}\n{heading}\n{'-' * len(heading)}\n")
+        out_f.write(text)
+
+
+def parse_suggestions(text: str) -> list[dict] | None:
+    """Parse the list of suggestions from a generated text, returning `None` if it contains no valid list.
+
+    Texts that contain a list that cannot be parsed are logged to `invalid_json.txt`.
+    """
+    if "[" not in text or "]" not in text:
+        return None
+    try:
+        attempt = parse_json_list(text)
+    except JSONExtractionError:
+        _log_invalid_json("Invalid JSON identified", text)
+        return None
+    if not all(isinstance(entry, dict) for entry in attempt):
+        _log_invalid_json("Invalid JSON identified", text)
+        return None
+    return attempt
+
+
+def suggestions_complete(parser: IncrementalJSONListParser) -> bool:
+    """Check whether a streamed list of suggestions is complete or has reached `suggestion_count` suggestions."""
+    return parser.complete or len(parser.items) >= settings.llm.suggestion_count
+
+
+def streamed_suggestions(parser: IncrementalJSONListParser) -> list[dict] | None:
+    """Return the first `suggestion_count` suggestions parsed from a stream, or `None` if they are not valid.
+
+    Streams that ended before the list was complete, for example because the token budget was reached, are invalid.
+    """
+    if not suggestions_complete(parser) or not all(isinstance(entry, dict) for entry in parser.items):
+        return None
+    return parser.items[: settings.llm.suggestion_count]
+
+
+def parse_streamed_suggestions(chunks: Iterable[str]) -> list[dict] | None:
+    """Parse the list of suggestions from a stream of generated text chunks.
+
+    Reading from the stream stops as soon as the list is complete, so that the caller can cancel the generation.
+    """
+    parser = IncrementalJSONListParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if suggestions_complete(parser):
+            break
+    return streamed_suggestions(parser)
+
+
+def request_sizes(count: int, max_candidates: int) -> list[int]:
+    """Split `count` responses into requests of at most `max_candidates` candidates each."""
+    return [min(max_candidates, count - start) for start in range(0, count, max_candidates)]
+
+
+class LLMSession(ABC):
+    """Base class for a session with an LLM backend.
+
+    A session holds the backend's client and model handle and is created once per process, so that connections are
+    reused across requests. Sub-classes implement :meth:`generate_single` and, if the backend can return multiple
+    candidates for a single request, set :attr:`max_candidates` and override :meth:`generate_candidates`.
+    """
+
+    max_candidates = 1
+
+    @abstractmethod
+    def generate_single(self, prompt: str) -> list[dict] | None:
+        """Generate a single response for the prompt, returning `None` if no valid response was generated."""
+
+    def generate_candidates(self, prompt: str, count: int) -> list[list[dict] | None]:
+        """Generate `count` responses for the prompt with a single request.
+
+        `count` is at most :attr:`max_candidates`. Invalid responses are returned as `None`.
+        """
+        return [self.generate_single(prompt) for _ in range(0, count)]
+
+    def _generate_candidates_or_none(self, prompt: str, count: int) -> list[list[dict] | None]:
+        """Generate `count` responses for the prompt, counting a transient error as `count` failed responses."""
+        try:
+            return self.generate_candidates(prompt, count)
+        except TransientLLMError:
+            return [None] * count
+
+    def generate(self, prompt: str, n: int) -> list[list[dict]]:
+        """Generate up to `n` valid responses for the prompt, using at most `max_attempts` attempts.
+
+        The first `n` attempts are made concurrently and only the attempts that failed are repeated.
+        """
+        results = []
+        attempts = 0
+        with ThreadPoolExecutor(max_workers=max(n, 1)) as executor:
+            while len(results) < n and attempts < settings.llm.max_attempts:
+                count = min(n - len(results), settings.llm.max_attempts - attempts)
+                attempts = attempts + count
+                for responses in executor.map(
+                    lambda size: self._generate_candidates_or_none(prompt, size),
+                    request_sizes(count, self.max_candidates),
+                ):
+                    results.extend(response for response in responses if response is not None)
+        return results[:n]
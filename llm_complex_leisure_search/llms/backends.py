@@ -0,0 +1,79 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Registry of the LLM backends."""
+
+from collections.abc import Callable
+
+from llm_complex_leisure_search.llms import LLMSession
+from llm_complex_leisure_search.settings import settings
+
+
+class Backend:
+    """An LLM backend together with the settings used to schedule requests to it.
+
+    The `result_name` is used as the prefix of the result files, `<result_name>_<data-set>.json`.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        result_name: str,
+        session: LLMSession,
+        max_concurrency: int,
+        requests_per_second: float,
+    ):
+        """Initialise the backend."""
+        self.label = label
+        self.result_name = result_name
+        self.session = session
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+
+
+def _gemini() -> Backend:
+    """Create the Gemini backend."""
+    from llm_complex_leisure_search.gemini import session
+
+    return Backend("Gemini", "gemini", session(), settings.gemini.max_concurrency, settings.gemini.requests_per_second)
+
+
+def _ollama() -> Backend:
+    """Create the Ollama backend."""
+    from llm_complex_leisure_search.llms.llama import session
+
+    return Backend(
+        "Llama 3.2", "llama-3-2", session(), settings.ollama.max_concurrency, settings.ollama.requests_per_second
+    )
+
+
+def _openai() -> Backend:
+    """Create the OpenAI-compatible backend."""
+    from llm_complex_leisure_search.llms.openai import session
+
+    return Backend(
+        settings.openai.model,
+        settings.openai.result_name,
+        session(),
+        settings.openai.max_concurrency,
+        settings.openai.requests_per_second,
+    )
+
+
+BACKENDS: dict[str, Callable[[], Backend]] = {"gemini": _gemini, "ollama": _ollama, "openai": _openai}
+
+
+def register_backend(name: str, factory: Callable[[], Backend]) -> None:
+    """Register a factory for an additional backend."""
+    BACKENDS[name] = factory
+
+
+def load_backend(name: str) -> Backend:
+    """Create the backend registered under `name`.
+
+    The backend's modules are only imported when it is loaded, so that unused backends do not need to be installed.
+    """
+    if name not in BACKENDS:
+        msg = f"Unknown backend {name}, must be one of {', '.join(BACKENDS)}"
+        raise KeyError(msg)
+    return BACKENDS[name]()
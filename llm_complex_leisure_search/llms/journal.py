@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Append-only journal for the LLM results."""
+
+import json
+import os
+
+from rich import print as console
+
+
+class ResultJournal:
+    """Append-only store for the results of one LLM on one data-set.
+
+    New results are appended as single lines to a `.jsonl` journal next to the result file and each line is flushed
+    and fsync'd, so that at most the line being written is lost if the process is killed. When the journal is opened,
+    the existing result file and any journal left over from an interrupted run are loaded and indexed by thread_id.
+    There is only one result per thread_id: a later result for a thread replaces the earlier one, unless it has fewer
+    runs. :meth:`compact` merges the journal into the result file, which keeps the existing `<llm>_<data-set>.json`
+    format and the order in which the threads were first added.
+
+    The journal is a context manager that compacts the results when the context is left.
+    """
+
+    def __init__(self, path: str):
+        """Open the journal for the result file at `path`."""
+        self.path = path
+        self.journal_path = f"{os.path.splitext(path)[0]}.jsonl"
+        self.results = []
+        self._positions = {}
+        if os.path.exists(self.path):
+            with open(self.path) as in_f:
+                for result in json.load(in_f):
+                    self._add(result)
+        if os.path.exists(self.journal_path):
+            self._replay()
+        self._out_f = open(self.journal_path, "a")
+
+    def _add(self, result: dict) -> None:
+        """Add a result to the in-memory results, replacing an existing result for the thread with fewer runs."""
+        position = self._positions.get(result["thread_id"])
+        if position is None:
+            self._positions[result["thread_id"]] = len(self.results)
+            self.results.append(result)
+        elif len(result["results"]) >= len(self.results[position]["results"]):
+            self.results[position] = result
+
+    def _replay(self) -> None:
+        """Load the results from the journal, truncating any incomplete line at the end."""
+        valid_length = 0
+        with open(self.journal_path, "rb") as in_f:
+            for line in in_f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self._add(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+                valid_length = valid_length + len(line)
+            journal_length = in_f.seek(0, os.SEEK_END)
+        if valid_length < journal_length:
+            console(f"[yellow]Discarding incomplete entry at the end of {self.journal_path}[/yellow]")
+            os.truncate(self.journal_path, valid_length)
+
+    def completed(self, min_results: int) -> set[str]:
+        """Return the thread_ids that have a result with at least `min_results` runs."""
+        return {
+            thread_id
+            for thread_id, position in self._positions.items()
+            if len(self.results[position]["results"]) >= min_results
+        }
+
+    def append(self, result: dict) -> None:
+        """Durably append a single result to the journal."""
+        self._out_f.write(json.dumps(result))
+        self._out_f.write("\n")
+        self._out_f.flush()
+        os.fsync(self._out_f.fileno())
+        self._add(result)
+
+    def compact(self) -> None:
+        """Write all results to the result file and empty the journal.
+
+        The result file is written to a temporary file first and then atomically moved into place, so that an
+        interrupted compaction leaves both the old result file and the journal intact.
+        """
+        if self._out_f.tell() == 0 and os.path.exists(self.path):
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as out_f:
+            json.dump(self.results, out_f)
+            out_f.flush()
+            os.fsync(out_f.fileno())
+        os.replace(tmp_path, self.path)
+        self._out_f.truncate(0)
+        self._out_f.seek(0)
+
+    def close(self) -> None:
+        """Compact the results and close the journal."""
+        self.compact()
+        self._out_f.close()
+        os.unlink(self.journal_path)
+
+    def __enter__(self) -> "ResultJournal":
+        """Enter the journal's context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Compact and close the journal when leaving the context."""
+        self.close()
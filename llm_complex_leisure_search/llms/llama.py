@@ -3,56 +3,67 @@
 # SPDX-License-Identifier: MIT
 """Llama 3.2 LLM."""
 
-import json
+from functools import lru_cache
 
-from httpx import ReadTimeout
-from ollama import Client
+from httpx import TransportError
+from ollama import Client, ResponseError
 
+from llm_complex_leisure_search.llms import (
+    LLMSession,
+    TransientLLMError,
+    parse_streamed_suggestions,
+    parse_suggestions,
+)
 from llm_complex_leisure_search.settings import settings
-from llm_complex_leisure_search.util import extract_json
 
 
-def generate_multiple_responses(prompt: str) -> list[dict | None]:
+class OllamaSession(LLMSession):
+    """Session with the Ollama server, holding a keep-alive client."""
+
+    def __init__(self):
+        """Create the client."""
+        self._client = Client(settings.ollama.host, timeout=settings.ollama.timeout)
+
+    def generate_single(self, prompt: str) -> list[dict] | None:
+        """Generate single response for the prompt using Llama 3.2.
+
+        In streaming mode, the stream is closed as soon as enough suggestions have been parsed, which makes the Ollama
+        server stop generating. The `token_budget` is passed to the server as `num_predict`. Network errors, rate
+        limits, and server errors are raised as :class:`TransientLLMError`.
+        """
+        options = {"num_predict": settings.llm.token_budget} if settings.llm.token_budget > 0 else None
+        try:
+            if settings.llm.streaming:
+                stream = self._client.generate(
+                    settings.ollama.model, prompt=prompt, format="json", options=options, stream=True
+                )
+                try:
+                    return parse_streamed_suggestions(chunk["response"] for chunk in stream)
+                finally:
+                    stream.close()
+            response = self._client.generate(settings.ollama.model, prompt=prompt, format="json", options=options)
+            return parse_suggestions(response["response"])
+        except ValueError:
+            return None
+        except TransportError as e:
+            raise TransientLLMError(str(e)) from e
+        except ResponseError as e:
+            if e.status_code == 429 or e.status_code >= 500:  # noqa: PLR2004
+                raise TransientLLMError(str(e)) from e
+            raise
+
+
+@lru_cache(maxsize=1)
+def session() -> OllamaSession:
+    """Return the process-wide :class:`OllamaSession`."""
+    return OllamaSession()
+
+
+def generate_multiple_responses(prompt: str) -> list[list[dict]]:
     """Generate multiple responses for a prompt using Llama 3.2."""
-    results = []
-    for _ in range(0, settings.llm.max_attempts):
-        result = generate_single_response(prompt)
-        if result is not None:
-            results.append(result)
-        if len(results) >= settings.llm.retest_target:
-            break
-    return results
+    return session().generate(prompt, settings.llm.retest_target)
 
 
-def generate_single_response(prompt: str) -> dict | None:
+def generate_single_response(prompt: str) -> list[dict] | None:
     """Generate single response for the prompt using Llama 3.2."""
-    try:
-        client = Client("http://localhost:11434", timeout=300)
-        response = client.generate("llama3.2", prompt=prompt, format="json")
-        text = response["response"]
-        if "[" in text and "]" in text:
-            try:
-                attempt = json.loads(extract_json(text))
-                for entry in attempt:
-                    if not isinstance(entry, dict):
-                        raise ValueError("Not a dict entry")  # noqa: EM101
-                return attempt
-            except json.JSONDecodeError:
-                with open("invalid_json.txt", "+a") as out_f:
-                    out_f.write("----------------------\n")
-                    out_f.write("Invalid JSON extracted\n")
-                    out_f.write("----------------------\n")
-                    out_f.write(extract_json(text))
-                return None
-            except Exception:
-                with open("invalid_json.txt", "+a") as out_f:
-                    out_f.write("-----------------------\n")
-                    out_f.write("Invalid JSON identified\n")
-                    out_f.write("-----------------------\n")
-                    out_f.write(text)
-                return None
-    except ValueError:
-        return None
-    except ReadTimeout:
-        return None
-    return None
+    return session().generate_single(prompt)
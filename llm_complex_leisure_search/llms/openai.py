@@ -0,0 +1,59 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""OpenAI-compatible chat completions backend."""
+
+from functools import lru_cache
+
+from httpx import Client, HTTPStatusError, TransportError
+
+from llm_complex_leisure_search.llms import LLMSession, TransientLLMError, parse_suggestions
+from llm_complex_leisure_search.settings import settings
+
+
+class OpenAISession(LLMSession):
+    """Session with an OpenAI-compatible chat completions API, holding a keep-alive client.
+
+    The API's `n` parameter is used to request multiple candidates per request. Servers that return fewer choices than
+    requested are handled by treating the missing choices as failed attempts.
+    """
+
+    def __init__(self):
+        """Create the client."""
+        headers = {}
+        if settings.openai.api_key:
+            headers["Authorization"] = f"Bearer {settings.openai.api_key}"
+        self._client = Client(base_url=settings.openai.base_url, headers=headers, timeout=settings.openai.timeout)
+        self.max_candidates = max(settings.openai.candidate_count, 1)
+
+    def generate_single(self, prompt: str) -> list[dict] | None:
+        """Generate single response for the prompt."""
+        return self.generate_candidates(prompt, 1)[0]
+
+    def generate_candidates(self, prompt: str, count: int) -> list[list[dict] | None]:
+        """Generate `count` responses for the prompt with a single request.
+
+        Network errors, rate limits, and server errors are raised as :class:`TransientLLMError`.
+        """
+        body = {"model": settings.openai.model, "messages": [{"role": "user", "content": prompt}], "n": count}
+        if settings.openai.json_mode:
+            body["response_format"] = {"type": "json_object"}
+        try:
+            response = self._client.post("chat/completions", json=body)
+            response.raise_for_status()
+        except TransportError as e:
+            raise TransientLLMError(str(e)) from e
+        except HTTPStatusError as e:
+            if e.response.status_code == 429 or e.response.status_code >= 500:  # noqa: PLR2004
+                raise TransientLLMError(str(e)) from e
+            raise
+        results = [
+            parse_suggestions(choice["message"]["content"] or "") for choice in response.json()["choices"][:count]
+        ]
+        return results + [None] * (count - len(results))
+
+
+@lru_cache(maxsize=1)
+def session() -> OpenAISession:
+    """Return the process-wide :class:`OpenAISession`."""
+    return OpenAISession()
@@ -0,0 +1,93 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Concurrent query runner for the LLMs."""
+
+import asyncio
+from collections.abc import Callable
+from random import uniform
+
+from rich import print as console
+from rich.progress import Progress
+
+from llm_complex_leisure_search.llms import LLMSession, TransientLLMError, request_sizes
+from llm_complex_leisure_search.settings import settings
+from llm_complex_leisure_search.util import TokenBucket
+
+
+class QueryRunner:
+    """Run the prompts for a list of tasks concurrently against one LLM backend.
+
+    At most `max_concurrency` requests are in flight at any time and requests are started at no more than
+    `requests_per_second`. Requests that raise a :class:`~llm_complex_leisure_search.llms.TransientLLMError` are retried
+    with jittered exponential backoff, requests that raise any other exception fail immediately. The attempts for a
+    single task are also made concurrently, so `max_concurrency` should match the number of requests the backend can
+    process in parallel.
+    """
+
+    def __init__(self, session: LLMSession, max_concurrency: int, requests_per_second: float):
+        """Initialise the runner with the session for the LLM backend."""
+        self._session = session
+        self._max_concurrency = max_concurrency
+        self._requests_per_second = requests_per_second
+
+    async def _generate_candidates(
+        self, prompt: str, count: int, semaphore: asyncio.Semaphore, bucket: TokenBucket
+    ) -> list[list[dict] | None]:
+        """Generate `count` responses with a single request, retrying requests that failed with a transient error."""
+        for retry in range(0, settings.llm.max_retries + 1):
+            async with semaphore:
+                await bucket.acquire()
+                try:
+                    return await asyncio.to_thread(self._session.generate_candidates, prompt, count)
+                except TransientLLMError as e:
+                    error = e
+                except Exception as e:
+                    console(f"[red bold]Error[/red bold] {type(e).__name__}: {e}")
+                    return [None] * count
+            if retry < settings.llm.max_retries:
+                delay = min(settings.llm.retry_backoff * 2**retry, settings.llm.retry_backoff_max)
+                await asyncio.sleep(uniform(delay / 2, delay))  # noqa: S311
+        console(f"[red bold]Error[/red bold] {error} (after {settings.llm.max_retries} retries)")
+        return [None] * count
+
+    async def _query(
+        self, task: dict, semaphore: asyncio.Semaphore, bucket: TokenBucket
+    ) -> tuple[dict, list[list[dict]]]:
+        """Generate up to `retest_target` responses for the task, using at most `max_attempts` attempts.
+
+        The first `retest_target` attempts are made concurrently, using as few requests as the backend's
+        `max_candidates` allows, and then only the failed attempts are repeated.
+        """
+        results = []
+        attempts = 0
+        while len(results) < settings.llm.retest_target and attempts < settings.llm.max_attempts:
+            count = min(settings.llm.retest_target - len(results), settings.llm.max_attempts - attempts)
+            attempts = attempts + count
+            for responses in await asyncio.gather(
+                *[
+                    self._generate_candidates(task["prompt"], size, semaphore, bucket)
+                    for size in request_sizes(count, self._session.max_candidates)
+                ]
+            ):
+                results.extend(response for response in responses if response is not None)
+        return task, results[: settings.llm.retest_target]
+
+    async def _run(self, tasks: list[dict], callback: Callable[[dict, list[list[dict]]], None], description: str):
+        """Run all tasks, passing each task's responses to the callback as soon as they are complete."""
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        bucket = TokenBucket(self._requests_per_second)
+        with Progress() as progress:
+            progress_task = progress.add_task(description, total=len(tasks))
+            for future in asyncio.as_completed([self._query(task, semaphore, bucket) for task in tasks]):
+                task, results = await future
+                callback(task, results)
+                progress.advance(progress_task)
+
+    def run(self, tasks: list[dict], callback: Callable[[dict, list[list[dict]]], None], description: str) -> None:
+        """Run the prompts for all tasks.
+
+        The `callback` is called with the task and the list of generated responses whenever a task is complete. It
+        is always called from the thread that called :meth:`run`.
+        """
+        asyncio.run(self._run(tasks, callback, description))
@@ -0,0 +1,74 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Stub OpenAI-compatible server for testing the query pipeline without a real LLM."""
+
+import json
+from hashlib import sha256
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rich import print as console
+
+SUGGESTION_COUNT = 20
+
+
+def stub_suggestions(prompt: str, choice: int) -> list[dict]:
+    """Generate a deterministic list of suggestions for a prompt."""
+    seed = sha256(f"{choice}:{prompt}".encode()).hexdigest()
+    return [
+        {
+            "answer": f"Stub answer {seed[:8]}-{rank} ({1950 + int(seed[rank % 32], 16) * 4 + rank})",
+            "explanation": "Generated by the stub server.",
+            "confidence": round(1 - rank / SUGGESTION_COUNT, 2),
+        }
+        for rank in range(0, SUGGESTION_COUNT)
+    ]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the chat completions endpoint."""
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Answer a chat completions request with stub suggestions."""
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt = request["messages"][-1]["content"]
+        body = json.dumps(
+            {
+                "object": "chat.completion",
+                "model": request.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": idx,
+                        "message": {
+                            "role": "assistant",
+                            "content": json.dumps({"suggestions": stub_suggestions(prompt, idx)}),
+                        },
+                        "finish_reason": "stop",
+                    }
+                    for idx in range(0, request.get("n", 1))
+                ],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        """Suppress the per-request logging."""
+
+
+def serve(host: str, port: int) -> None:
+    """Run the stub server until it is interrupted."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    console(f"Stub server listening on http://{host}:{port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,110 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Concurrent existence lookup pipeline for the unique answers."""
+
+import asyncio
+import json
+import os
+from collections.abc import Callable
+
+from rich import print as console
+from rich.progress import Progress
+
+from llm_complex_leisure_search.util import TokenBucket
+
+LOOKUP_FIELDS = ("exists", "exists_with_qualifier", "popularity")
+
+
+def _journal_key(answer: dict) -> str:
+    """Return the key under which the lookup result for an answer is stored in the journal."""
+    return json.dumps([answer["answer"][0], list(answer["answer"][1])])
+
+
+class LookupPipeline:
+    """Look up whether the unique answers exist, using a bounded pool of workers.
+
+    The `check` function is called with batches of up to `batch_size` answers and returns one dictionary with the
+    :data:`LOOKUP_FIELDS` for each answer in the batch. At most `max_concurrency` batches are checked at the same time
+    and no more than `requests_per_second` batches are started per second. Every completed batch is appended to a
+    side journal next to the answers file, so that an interrupted run can be resumed. When all answers have been
+    checked, the results are merged back into the answers file and the journal is removed.
+    """
+
+    def __init__(
+        self,
+        check: Callable[[list[dict]], list[dict]],
+        max_concurrency: int,
+        requests_per_second: float,
+        batch_size: int = 1,
+    ):
+        """Initialise the pipeline with the `check` function for a lookup service."""
+        self._check = check
+        self._max_concurrency = max_concurrency
+        self._requests_per_second = requests_per_second
+        self._batch_size = batch_size
+
+    async def _check_batch(
+        self, batch: list[dict], semaphore: asyncio.Semaphore, bucket: TokenBucket
+    ) -> tuple[list[dict], list[dict] | None]:
+        """Check a single batch of answers, returning `None` as the result if the check failed."""
+        async with semaphore:
+            await bucket.acquire()
+            try:
+                return batch, await asyncio.to_thread(self._check, batch)
+            except Exception as e:
+                console(f"[red bold]Error[/red bold] {e}")
+                return batch, None
+
+    async def _run(self, batches: list[list[dict]], out_f, description: str) -> None:
+        """Check all batches and append the results to the journal as soon as each batch is complete."""
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        bucket = TokenBucket(self._requests_per_second)
+        with Progress() as progress:
+            progress_task = progress.add_task(description, total=sum(len(batch) for batch in batches))
+            for future in asyncio.as_completed([self._check_batch(batch, semaphore, bucket) for batch in batches]):
+                batch, results = await future
+                if results is not None:
+                    for answer, result in zip(batch, results, strict=True):
+                        update = {field: result[field] for field in LOOKUP_FIELDS}
+                        answer.update(update)
+                        out_f.write(json.dumps({"answer": _journal_key(answer), "result": update}))
+                        out_f.write("\n")
+                    out_f.flush()
+                    os.fsync(out_f.fileno())
+                progress.advance(progress_task, len(batch))
+
+    def run(self, path: str, description: str = "Looking up answers") -> None:
+        """Look up all answers in the file at `path` that are not yet known to exist."""
+        with open(path) as in_f:
+            answers = json.load(in_f)
+        journal_path = f"{os.path.splitext(path)[0]}.lookup.jsonl"
+        done = {}
+        if os.path.exists(journal_path):
+            valid_length = 0
+            with open(journal_path, "rb") as in_f:
+                for line in in_f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    done[entry["answer"]] = entry["result"]
+                    valid_length = valid_length + len(line)
+            os.truncate(journal_path, valid_length)
+        pending = []
+        for answer in answers:
+            key = _journal_key(answer)
+            if key in done:
+                answer.update(done[key])
+            elif not answer["exists"]:
+                pending.append(answer)
+        batches = [pending[idx : idx + self._batch_size] for idx in range(0, len(pending), self._batch_size)]
+        with open(journal_path, "a") as out_f:
+            asyncio.run(self._run(batches, out_f, description))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as out_f:
+            json.dump(answers, out_f)
+        os.replace(tmp_path, path)
+        os.unlink(journal_path)
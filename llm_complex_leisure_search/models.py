@@ -0,0 +1,41 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Typed models of the LLM result files."""
+
+from dataclasses import dataclass
+
+from pydantic import TypeAdapter
+
+
+@dataclass(slots=True)
+class Suggestion:
+    """A single suggestion generated by an LLM, normalised to its title and qualifiers.
+
+    Only the fields used in the analysis are kept, all other keys of the result files are dropped when loading.
+    """
+
+    title: str
+    qualifiers: tuple[str | None, ...] = ()
+    normalised_confidence: float | None = None
+
+
+@dataclass(slots=True)
+class Thread:
+    """The runs generated by an LLM for one thread, each run being a ranked list of suggestions."""
+
+    thread_id: str
+    results: list[list[Suggestion]]
+
+
+THREADS = TypeAdapter(list[Thread])
+
+
+def load_threads(path: str) -> list[Thread]:
+    """Load and validate the threads of a result file.
+
+    The file's JSON is validated directly into the models, without building the intermediate dicts. Result files that
+    have not been normalised with the `fix` commands raise a :class:`pydantic.ValidationError`.
+    """
+    with open(path, "rb") as in_f:
+        return THREADS.validate_json(in_f.read())
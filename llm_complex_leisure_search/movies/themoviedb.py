@@ -1,13 +1,15 @@
 # SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
 #
 # SPDX-License-Identifier: MIT
-"""IGDB API functions."""
+"""TheMovieDB API functions."""
 
 from enum import Enum
+from functools import partial
 from urllib.parse import quote_plus
 
 from httpx import Client
 
+from llm_complex_leisure_search.cache import response_cache
 from llm_complex_leisure_search.settings import settings
 
 
@@ -18,20 +20,52 @@ class SearchMode(str, Enum):
     EXACT = "exact"
 
 
-def search(name: str, search_mode: SearchMode = SearchMode.DEFAULT) -> list[dict]:
-    """Search the TheMovieDB API by name."""
+def _fetch_search(name: str) -> list[dict] | None:
+    """Fetch the search results for a name from the TheMovieDB API."""
     with Client(timeout=30) as client:
         result = client.get(
             f"https://api.themoviedb.org/3/search/movie?query={quote_plus(name)}&include_adult=false&language=en-US&page=1",
             headers=[("Authorization", f"Bearer {settings.themoviedb.bearer_token}")],
         )
         if result.status_code == 200:  # noqa: PLR2004
-            if search_mode == SearchMode.EXACT:
-                return [
-                    movie
-                    for movie in result.json()["results"]
-                    if movie["original_title"] == name or movie["original_title"] == name.replace(" and ", " & ")
-                ]
-            else:
-                return result.json()["results"]
+            return result.json()["results"]
+        return None
+
+
+def search(name: str, search_mode: SearchMode = SearchMode.DEFAULT) -> list[dict]:
+    """Search the TheMovieDB API by name."""
+    results = response_cache().cached("themoviedb.search", name, partial(_fetch_search, name))
+    if results is None:
         return []
+    if search_mode == SearchMode.EXACT:
+        return [
+            movie
+            for movie in results
+            if movie["original_title"] == name or movie["original_title"] == name.replace(" and ", " & ")
+        ]
+    return results
+
+
+def check_answer(answer: dict) -> dict:
+    """Check whether a movie answer exists in TheMovieDB."""
+    result = {
+        "exists": answer["exists"],
+        "exists_with_qualifier": answer["exists_with_qualifier"],
+        "popularity": answer["popularity"],
+    }
+    movies = search(answer["answer"][0], SearchMode.EXACT)
+    if len(movies) > 0:
+        result["exists"] = True
+        result["popularity"] = sum([movie["popularity"] for movie in movies if "popularity" in movie]) / len(movies)
+    for qualifier in answer["answer"][1]:
+        for movie in movies:
+            if "release_date" in movie and qualifier == movie["release_date"][:4]:
+                result["exists_with_qualifier"] = True
+                if "popularity" in movie:
+                    result["popularity"] = movie["popularity"]
+    return result
+
+
+def check_answers(answers: list[dict]) -> list[dict]:
+    """Check whether the movie answers exist in TheMovieDB."""
+    return [check_answer(answer) for answer in answers]
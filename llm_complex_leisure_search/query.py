@@ -0,0 +1,86 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Orchestration of the LLM queries for the solved threads."""
+
+import json
+import os
+from collections.abc import Callable
+
+from rich import print as console
+
+from llm_complex_leisure_search.books.data import normalise_entry as normalise_book
+from llm_complex_leisure_search.constants import ANNOTATION_DATA_SETS
+from llm_complex_leisure_search.llms.backends import Backend, load_backend
+from llm_complex_leisure_search.llms.journal import ResultJournal
+from llm_complex_leisure_search.llms.runner import QueryRunner
+from llm_complex_leisure_search.settings import settings
+from llm_complex_leisure_search.util import normalise_title_year_entry
+
+NORMALISERS: dict[str, Callable[[dict], None]] = {
+    "books": normalise_book,
+    "games": normalise_title_year_entry,
+    "movies": normalise_title_year_entry,
+}
+
+
+def _store_result(journal: ResultJournal, domain: str, task: dict, responses: list[list[dict]]) -> bool:
+    """Normalise the responses for a single task and append them to the journal, returning whether that succeeded.
+
+    Responses with malformed entries and failed writes to the journal are logged and skipped, any other error is
+    raised.
+    """
+    try:
+        for attempt in responses:
+            if attempt is not None:
+                for entry in attempt:
+                    NORMALISERS[domain](entry)
+        journal.append({"thread_id": task["thread_id"], "results": responses})
+    except (KeyError, TypeError, ValueError, OSError) as e:
+        console(f"[red bold]Error[/red bold] {task['thread_id']}: {type(e).__name__}: {e}")
+        return False
+    return True
+
+
+def query_backend(
+    domain: str, backend: Backend, data_sets: list[str] | None = None, output_name: str | None = None
+) -> None:
+    """Query the backend for all solved threads of the domain that do not yet have enough results.
+
+    Results are written to `data/<domain>/<output_name>_<data-set>.json` via a :class:`ResultJournal`, so that
+    interrupted runs are resumed. The `output_name` defaults to the backend's `result_name`. Data-sets without a solved
+    threads file are skipped. The number of results that could not be stored is reported for each data-set.
+    """
+    if domain not in NORMALISERS:
+        msg = f"Unknown domain {domain}, must be one of {', '.join(NORMALISERS)}"
+        raise KeyError(msg)
+    output_name = output_name if output_name else backend.result_name
+    runner = QueryRunner(backend.session, backend.max_concurrency, backend.requests_per_second)
+    for data_set in data_sets if data_sets else ANNOTATION_DATA_SETS[domain]:
+        solved_path = os.path.join("data", domain, f"solved_{data_set}.json")
+        if not os.path.exists(solved_path):
+            console(f"[yellow]Skipping {domain} {data_set}, {solved_path} not found[/yellow]")
+            continue
+        with open(solved_path) as in_f:
+            tasks = json.load(in_f)
+        with ResultJournal(os.path.join("data", domain, f"{output_name}_{data_set}.json")) as journal:
+            completed = journal.completed(settings.llm.retest_target)
+            pending = [task for task in tasks if task["thread_id"] not in completed]
+            failed = []
+
+            def store(task: dict, responses: list[list[dict]], journal: ResultJournal = journal, failed: list = failed):
+                if not _store_result(journal, domain, task, responses):
+                    failed.append(task["thread_id"])
+
+            runner.run(pending, store, description=f"Querying {backend.label} ({data_set})")
+        if failed:
+            console(
+                f"[yellow]{len(failed)} of {len(pending)} results for {domain} {data_set} could not be stored[/yellow]"
+            )
+
+
+def run_query(
+    domain: str, backend_name: str, data_sets: list[str] | None = None, output_name: str | None = None
+) -> None:
+    """Load the backend registered under `backend_name` and query it for the domain's solved threads."""
+    query_backend(domain, load_backend(backend_name), data_sets, output_name)
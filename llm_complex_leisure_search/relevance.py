@@ -0,0 +1,144 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Sparse matrix of the JDOC relevance assessments."""
+
+import csv
+import os
+
+import numpy
+from scipy.sparse import csr_matrix, diags
+
+from llm_complex_leisure_search.util import file_digest
+
+RELEVANCE_ASSESSMENTS_FILE = os.path.join("data", "jdoc-relevance-assessments.tsv")
+VECTOR_START_COLUMN = 5
+CACHE_VERSION = 1
+
+
+class RelevanceMatrix:
+    """The relevance assessment vectors as a sparse CSR matrix with one row per thread.
+
+    The vectors consist of all columns after the first five, with values that are not integers counted as 0.
+    """
+
+    def __init__(self, matrix: csr_matrix, thread_ids: list[str], columns: list[str]):
+        """Initialise the matrix."""
+        self.matrix = matrix
+        self.thread_ids = thread_ids
+        self.columns = columns
+        self.index = {thread_id: idx for idx, thread_id in enumerate(thread_ids)}
+
+    def __contains__(self, thread_id: str) -> bool:
+        """Check whether there is a vector for the thread."""
+        return thread_id in self.index
+
+    def has_assessments(self, thread_id: str) -> bool:
+        """Check whether there is a vector with at least one non-zero value for the thread."""
+        idx = self.index.get(thread_id)
+        return idx is not None and self.matrix.indptr[idx + 1] > self.matrix.indptr[idx]
+
+    def rows(self, thread_ids: list[str]) -> csr_matrix:
+        """Return the vectors of the threads, in the order of `thread_ids`."""
+        return self.matrix[[self.index[thread_id] for thread_id in thread_ids]]
+
+
+def normalise_sparse_rows(matrix: csr_matrix) -> csr_matrix:
+    """Scale the rows of the sparse matrix to unit length, leaving rows that are all zero unchanged.
+
+    The dot products of the normalised rows, for example `matrix @ matrix.T`, are the cosine similarities.
+    """
+    norms = numpy.sqrt(numpy.asarray(matrix.multiply(matrix).sum(axis=1), dtype=numpy.float64).ravel())
+    return csr_matrix(diags(1 / numpy.where(norms > 0, norms, 1)) @ matrix)
+
+
+def parse_relevance_assessments(path: str) -> RelevanceMatrix:
+    """Parse the relevance assessments TSV file in a single pass into a :class:`RelevanceMatrix`."""
+    thread_ids = []
+    data = []
+    indices = []
+    indptr = [0]
+    with open(path, newline="") as in_f:
+        reader = csv.reader(in_f, delimiter="\t")
+        columns = next(reader)[VECTOR_START_COLUMN:]
+        for line in reader:
+            thread_ids.append(line[0])
+            for column, value in enumerate(line[VECTOR_START_COLUMN:]):
+                if value != "0":
+                    try:
+                        number = int(value)
+                    except ValueError:
+                        continue
+                    if number != 0:
+                        data.append(number)
+                        indices.append(column)
+            indptr.append(len(data))
+    matrix = csr_matrix(
+        (
+            numpy.array(data, dtype=numpy.int64),
+            numpy.array(indices, dtype=numpy.int32),
+            numpy.array(indptr, dtype=numpy.int64),
+        ),
+        shape=(len(thread_ids), len(columns)),
+    )
+    return RelevanceMatrix(matrix, thread_ids, columns)
+
+
+def cache_path(path: str) -> str:
+    """Return the path of the `.npz` cache next to the relevance assessments file."""
+    return f"{os.path.splitext(path)[0]}.npz"
+
+
+def _write_cache(path: str, relevance: RelevanceMatrix, source_stat: os.stat_result, digest: str) -> None:
+    """Write the relevance matrix into the `.npz` cache, replacing any existing cache file atomically."""
+    target = cache_path(path)
+    tmp_target = f"{target}.{os.getpid()}.tmp.npz"
+    numpy.savez(
+        tmp_target,
+        version=CACHE_VERSION,
+        mtime_ns=source_stat.st_mtime_ns,
+        size=source_stat.st_size,
+        sha256=digest,
+        data=relevance.matrix.data,
+        indices=relevance.matrix.indices,
+        indptr=relevance.matrix.indptr,
+        shape=numpy.array(relevance.matrix.shape),
+        thread_ids=numpy.array(relevance.thread_ids),
+        columns=numpy.array(relevance.columns),
+    )
+    os.replace(tmp_target, target)
+
+
+def _read_cache(target: str) -> tuple[dict, RelevanceMatrix]:
+    """Read the metadata and the relevance matrix from the `.npz` cache."""
+    with numpy.load(target, allow_pickle=False) as cache:
+        metadata = {
+            "version": int(cache["version"]),
+            "mtime_ns": int(cache["mtime_ns"]),
+            "size": int(cache["size"]),
+            "sha256": str(cache["sha256"]),
+        }
+        matrix = csr_matrix((cache["data"], cache["indices"], cache["indptr"]), shape=tuple(cache["shape"].tolist()))
+        return (metadata, RelevanceMatrix(matrix, cache["thread_ids"].tolist(), cache["columns"].tolist()))
+
+
+def load_relevance_matrix(path: str = RELEVANCE_ASSESSMENTS_FILE) -> RelevanceMatrix:
+    """Load the relevance assessments via the `.npz` cache next to the source file.
+
+    The cache is used if the source file's mtime and size are unchanged. If they have changed, but the content digest
+    is unchanged, the cache is rewritten with the new metadata. Otherwise the cache is rebuilt from the source file.
+    """
+    source_stat = os.stat(path)
+    target = cache_path(path)
+    if os.path.exists(target):
+        metadata, relevance = _read_cache(target)
+        if metadata["version"] == CACHE_VERSION:
+            if metadata["mtime_ns"] == source_stat.st_mtime_ns and metadata["size"] == source_stat.st_size:
+                return relevance
+            digest = file_digest(path)
+            if metadata["sha256"] == digest:
+                _write_cache(path, relevance, source_stat, digest)
+                return relevance
+    relevance = parse_relevance_assessments(path)
+    _write_cache(path, relevance, source_stat, file_digest(path))
+    return relevance
@@ -0,0 +1,208 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Diversity sampling of threads based on their relevance assessment vectors."""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy
+
+OBJECTIVES = ("average", "maxmin", "dpp", "kmedoids")
+DPP_REGULARISATION = 1e-6
+
+
+def pairwise_similarities(vectors: numpy.ndarray, selected: numpy.ndarray) -> numpy.ndarray:
+    """Return the cosine similarities of all distinct pairs of the `selected` rows of the normalised `vectors`."""
+    similarities = vectors[selected] @ vectors[selected].T
+    return similarities[~numpy.eye(len(selected), dtype=bool)]
+
+
+def diversity_scores(vectors: numpy.ndarray, selected: numpy.ndarray) -> dict[str, float]:
+    """Calculate the average pairwise cosine similarity and the minimum pairwise cosine distance of a sample."""
+    similarities = pairwise_similarities(vectors, selected)
+    if len(similarities) == 0:
+        return {"similarity.average": 0.0, "distance.min": 1.0}
+    return {"similarity.average": float(similarities.mean()), "distance.min": max(float(1 - similarities.max()), 0.0)}
+
+
+def objective_score(objective: str, vectors: numpy.ndarray, selected: numpy.ndarray) -> float:
+    """Calculate the score of a sample under an objective, lower scores being better.
+
+    * `average`: the average pairwise cosine similarity.
+    * `maxmin`: the maximum pairwise cosine similarity.
+    * `dpp`: the negative log-determinant of the sample's (regularised) similarity kernel.
+    * `kmedoids`: the average cosine distance of all rows to their most similar sample row.
+    """
+    if objective == "average":
+        similarities = pairwise_similarities(vectors, selected)
+        return float(similarities.mean()) if len(similarities) > 0 else 0.0
+    elif objective == "maxmin":
+        similarities = pairwise_similarities(vectors, selected)
+        return float(similarities.max()) if len(similarities) > 0 else 0.0
+    elif objective == "dpp":
+        kernel = vectors[selected] @ vectors[selected].T + DPP_REGULARISATION * numpy.eye(len(selected))
+        return float(-numpy.linalg.slogdet(kernel)[1])
+    elif objective == "kmedoids":
+        return float(1 - (vectors @ vectors[selected].T).max(axis=1).mean())
+    msg = f"Unknown objective {objective}, must be one of {', '.join(OBJECTIVES)}"
+    raise ValueError(msg)
+
+
+def _batch(available: numpy.ndarray, rng: numpy.random.Generator, batch_size: int) -> numpy.ndarray:
+    """Draw a random batch of the available rows in time independent of the number of rows.
+
+    Rows are drawn with replacement and the rows that are not available are dropped. Only if none of the drawn rows is
+    available, the batch is drawn from all available rows.
+    """
+    batch = rng.integers(len(available), size=batch_size)
+    batch = numpy.unique(batch[available[batch]])
+    if len(batch) == 0:
+        batch = numpy.flatnonzero(available)
+        batch = rng.choice(batch, size=min(batch_size, len(batch)), replace=False)
+    return batch
+
+
+def greedy_sample(
+    vectors: numpy.ndarray,
+    k: int,
+    rng: numpy.random.Generator,
+    objective: str = "average",
+    batch_size: int | None = None,
+) -> numpy.ndarray:
+    """Greedily select `k` rows of the normalised `vectors` that are as dissimilar to each other as possible.
+
+    The first row is picked at random. Every further step picks the row with the lowest cost, ties being broken at
+    random. The cost depends on the `objective`:
+
+    * `average`: the average similarity to the rows selected so far.
+    * `maxmin`: the maximum similarity to the rows selected so far (farthest-point sampling).
+    * `dpp`: the negative squared distance to the span of the rows selected so far, which is the greedy MAP
+      approximation of a determinantal point process with the cosine similarity kernel.
+
+    In the exact mode the costs of all rows are tracked and updated with one matrix-vector product per step. If a
+    `batch_size` is given, each step only calculates the costs of a random batch of rows, which makes the cost of a step
+    independent of the number of rows.
+    """
+    if objective not in ("average", "maxmin", "dpp"):
+        msg = f"Unknown greedy objective {objective}"
+        raise ValueError(msg)
+    k = min(k, vectors.shape[0])
+    selected = numpy.empty(k, dtype=numpy.int64)
+    available = numpy.ones(vectors.shape[0], dtype=bool)
+    basis = numpy.empty((0, vectors.shape[1]), dtype=numpy.float64)
+    if batch_size is None:
+        if objective == "average":
+            costs = numpy.zeros(vectors.shape[0], dtype=numpy.float64)
+        elif objective == "maxmin":
+            costs = numpy.full(vectors.shape[0], -numpy.inf, dtype=numpy.float64)
+        else:
+            costs = -numpy.einsum("ij,ij->i", vectors, vectors)
+    for step in range(0, k):
+        if step == 0:
+            new_idx = rng.integers(vectors.shape[0])
+        else:
+            if batch_size is None:
+                candidates = numpy.flatnonzero(available)
+                candidate_costs = costs[candidates]
+            else:
+                candidates = _batch(available, rng, batch_size)
+                if objective == "dpp":
+                    projections = vectors[candidates] @ basis.T
+                    candidate_costs = -(
+                        numpy.einsum("ij,ij->i", vectors[candidates], vectors[candidates])
+                        - numpy.einsum("ij,ij->i", projections, projections)
+                    )
+                else:
+                    similarities = vectors[candidates] @ vectors[selected[:step]].T
+                    candidate_costs = similarities.sum(axis=1) if objective == "average" else similarities.max(axis=1)
+            new_idx = rng.choice(candidates[candidate_costs == candidate_costs.min()])
+        selected[step] = new_idx
+        available[new_idx] = False
+        if objective == "dpp":
+            residual = vectors[new_idx] - basis.T @ (basis @ vectors[new_idx])
+            norm = numpy.linalg.norm(residual)
+            if norm > DPP_REGULARISATION:
+                basis = numpy.vstack([basis, residual / norm])
+                if batch_size is None:
+                    costs += (vectors @ basis[-1]) ** 2
+        elif batch_size is None:
+            similarities = vectors @ vectors[new_idx]
+            if objective == "average":
+                costs += similarities
+            else:
+                numpy.maximum(costs, similarities, out=costs)
+    return selected
+
+
+def kmedoids_sample(
+    vectors: numpy.ndarray,
+    k: int,
+    rng: numpy.random.Generator,
+    batch_size: int | None = None,
+    max_iterations: int = 100,
+) -> numpy.ndarray:
+    """Select `k` rows of the normalised `vectors` as the medoids of a k-medoids clustering with the cosine distance.
+
+    The medoids are initialised at random and then alternately all rows are assigned to their most similar medoid and
+    each cluster's medoid is moved to the row with the lowest total distance to the other rows in the cluster. If a
+    `batch_size` is given, the clustering is only calculated for a random batch of at least `k` rows.
+    """
+    if batch_size is None or max(batch_size, k) >= vectors.shape[0]:
+        rows = numpy.arange(vectors.shape[0])
+    else:
+        rows = rng.choice(vectors.shape[0], size=max(batch_size, k), replace=False)
+    points = vectors[rows]
+    k = min(k, len(rows))
+    medoids = rng.choice(len(rows), size=k, replace=False)
+    for _ in range(0, max_iterations):
+        assignment = (points @ points[medoids].T).argmax(axis=1)
+        assignment[medoids] = numpy.arange(k)
+        new_medoids = medoids.copy()
+        for cluster in range(0, k):
+            members = numpy.flatnonzero(assignment == cluster)
+            new_medoids[cluster] = members[(points[members] @ points[members].T).sum(axis=1).argmax()]
+        if numpy.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+    return rows[medoids]
+
+
+def _restart(
+    vectors: numpy.ndarray, k: int, objective: str, batch_size: int | None, seed: numpy.random.SeedSequence
+) -> tuple[float, numpy.ndarray]:
+    """Run a single restart of the sampler, returning the sample's objective score and the sample."""
+    rng = numpy.random.default_rng(seed)
+    if objective == "kmedoids":
+        selected = kmedoids_sample(vectors, k, rng, batch_size=batch_size)
+    else:
+        selected = greedy_sample(vectors, k, rng, objective=objective, batch_size=batch_size)
+    return (objective_score(objective, vectors, selected), selected)
+
+
+def diverse_sample(
+    vectors: numpy.ndarray,
+    k: int,
+    restarts: int = 10,
+    seed: int | numpy.random.SeedSequence | None = None,
+    objective: str = "average",
+    batch_size: int | None = None,
+    max_workers: int | None = None,
+) -> tuple[numpy.ndarray, float]:
+    """Select the indices of a diverse sample of `k` rows of the normalised `vectors`.
+
+    The sampler for the `objective` is restarted `restarts` times in parallel worker processes and the sample with the
+    lowest :func:`objective_score` is returned together with its score. Each restart gets its own random generator
+    spawned from `seed`, so that the result is reproducible for a given seed, regardless of the number of workers. A
+    `batch_size` switches to the approximate samplers.
+    """
+    if objective not in OBJECTIVES:
+        msg = f"Unknown objective {objective}, must be one of {', '.join(OBJECTIVES)}"
+        raise ValueError(msg)
+    if not isinstance(seed, numpy.random.SeedSequence):
+        seed = numpy.random.SeedSequence(seed)
+    seeds = seed.spawn(restarts)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        samples = list(executor.map(partial(_restart, vectors, k, objective, batch_size), seeds))
+    score, selected = min(samples, key=lambda sample: sample[0])
+    return (selected, score)
@@ -3,6 +3,8 @@
 # SPDX-License-Identifier: MIT
 """Application settings."""
 
+import os
+
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -12,18 +14,66 @@ class IGDBSettings(BaseModel):
 
     client_id: str = ""
     client_secret: str = ""
+    max_concurrency: int = 4
+    requests_per_second: float = 3
 
 
 class TheMovieDBSettings(BaseModel):
     """Settings for the TheMovieDB."""
 
     bearer_token: str = ""
+    max_concurrency: int = 8
+    requests_per_second: float = 20
+
+
+class OpenLibrarySettings(BaseModel):
+    """Settings for the OpenLibrary API."""
+
+    max_concurrency: int = 2
+    requests_per_second: float = 1
+
+
+class CacheSettings(BaseModel):
+    """Settings for the response cache of the lookup services."""
+
+    path: str = os.path.join("data", ".response-cache.sqlite")
+    ttl: float = 60 * 60 * 24 * 90
+    max_size: int = 1024 * 1024 * 1024
+    offline: bool = False
 
 
 class GeminiSettings(BaseModel):
     """Settings for the Gemini API."""
 
     api_key: str = ""
+    model: str = "gemini-1.5-flash"
+    candidate_count: int = 1
+    max_concurrency: int = 4
+    requests_per_second: float = 0.5
+
+
+class OllamaSettings(BaseModel):
+    """Settings for the Ollama server."""
+
+    host: str = "http://localhost:11434"
+    model: str = "llama3.2"
+    timeout: float = 300
+    max_concurrency: int = 4
+    requests_per_second: float = 0
+
+
+class OpenAISettings(BaseModel):
+    """Settings for the OpenAI-compatible chat completions API."""
+
+    base_url: str = "http://localhost:8000/v1"
+    api_key: str = ""
+    model: str = "gpt-4o-mini"
+    result_name: str = "openai"
+    timeout: float = 300
+    candidate_count: int = 1
+    json_mode: bool = True
+    max_concurrency: int = 4
+    requests_per_second: float = 0
 
 
 class LLMSettings(BaseModel):
@@ -31,6 +81,12 @@ class LLMSettings(BaseModel):
 
     retest_target: int = 3
     max_attempts: int = 10
+    max_retries: int = 5
+    retry_backoff: float = 2
+    retry_backoff_max: float = 60
+    streaming: bool = False
+    suggestion_count: int = 20
+    token_budget: int = 0
 
 
 class Settings(BaseSettings):
@@ -38,8 +94,12 @@ class Settings(BaseSettings):
 
     igdb: IGDBSettings = IGDBSettings()
     gemini: GeminiSettings = GeminiSettings()
+    ollama: OllamaSettings = OllamaSettings()
+    openai: OpenAISettings = OpenAISettings()
     llm: LLMSettings = LLMSettings()
     themoviedb: TheMovieDBSettings = TheMovieDBSettings()
+    openlibrary: OpenLibrarySettings = OpenLibrarySettings()
+    cache: CacheSettings = CacheSettings()
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", env_nested_delimiter=".")
 
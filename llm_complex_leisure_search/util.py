@@ -3,38 +3,112 @@
 # SPDX-License-Identifier: MIT
 """Utility functionality."""
 
+import asyncio
+import hashlib
+import json
 import re
+from time import monotonic
 
 
 class JSONExtractionError(Exception):
     """Error indicating that no valid JSON could be extracted."""
 
 
-def extract_json(text: str) -> str:
-    """Extract JSON data from a text."""
-    text = text[text.find("[") :]
-    buffer = []
-    square_brackets = 0
-    escape_next = False
-    in_string = False
-    for char in text:
-        if char == "[" and not in_string and not escape_next:
-            square_brackets = square_brackets + 1
-        elif char == "]" and not in_string and not escape_next:
-            square_brackets = square_brackets - 1
-        elif char == '"' and not escape_next:
-            in_string = not in_string
-        elif char == "\\" and not escape_next:
-            escape_next = True
-        else:
-            escape_next = False
-        buffer.append(char)
-        if square_brackets == 0:
-            break
-    if square_brackets > 0:
-        msg = f"Unbalanced brackets {square_brackets}"
+JSON_DECODER = json.JSONDecoder()
+JSON_VALUE_START = re.compile(r"[\[{]")
+JSON_LIST_START = re.compile(r"\[\s*[{\]]")
+JSON_NESTED_TOKENS = re.compile(r'"(?:[^"\\]|\\.)*(")?|[\[\]{}]')
+JSON_SEPARATORS = re.compile(r"[\s,]*")
+
+
+class IncrementalJSONListParser:
+    """Incremental parser for a JSON list that is generated as a stream of text chunks.
+
+    The list starts at the first top-level `[`, or the first `[` directly inside a top-level JSON object, that is
+    followed by a `{` or `]`. Brackets inside other values are skipped. Each list item is parsed as soon as it is
+    complete, which allows the generation to be stopped early.
+    """
+
+    def __init__(self):
+        """Initialise the empty parser."""
+        self.items = []
+        self.complete = False
+        self._buffer = ""
+        self._position = None
+        self._search_from = 0
+        self._brackets = []
+
+    def _find_list_start(self) -> int | None:
+        """Scan the buffer for the start of the list, returning `None` if it needs more text to decide."""
+        while True:
+            if len(self._brackets) == 0:
+                match = JSON_VALUE_START.search(self._buffer, self._search_from)
+            else:
+                match = JSON_NESTED_TOKENS.search(self._buffer, self._search_from)
+            if match is None:
+                self._search_from = len(self._buffer)
+                return None
+            token = match.group()
+            if token.startswith('"') and match.group(1) is None:
+                # The string may continue in the next chunk
+                self._search_from = match.start()
+                return None
+            if token == "[" and (len(self._brackets) == 0 or self._brackets == ["{"]):
+                if JSON_LIST_START.match(self._buffer, match.start()):
+                    return match.start()
+                elif self._buffer[match.end() :].strip() == "":
+                    self._search_from = match.start()
+                    return None
+            self._search_from = match.end()
+            if token in ("[", "{"):
+                self._brackets.append(token)
+            elif token in ("]", "}") and len(self._brackets) > 0:
+                self._brackets.pop()
+
+    def feed(self, chunk: str) -> list:
+        """Add a chunk of text and return the list items that were completed by it."""
+        if self.complete:
+            return []
+        self._buffer = self._buffer + chunk
+        if self._position is None:
+            start = self._find_list_start()
+            if start is None:
+                return []
+            self._position = start + 1
+        new_items = []
+        while True:
+            position = JSON_SEPARATORS.match(self._buffer, self._position).end()
+            if position >= len(self._buffer):
+                break
+            elif self._buffer[position] == "]":
+                self.complete = True
+                break
+            try:
+                item, end = JSON_DECODER.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                break
+            # A number at the end of the buffer may continue in the next chunk
+            if end >= len(self._buffer.rstrip()) and not isinstance(item, dict | list | str):
+                break
+            self._position = end
+            new_items.append(item)
+        self.items.extend(new_items)
+        return new_items
+
+
+def parse_json_list(text: str) -> list:
+    """Parse the first JSON list from a complete text.
+
+    The list is found with the same rules as in :class:`IncrementalJSONListParser`, so that the batch and the streamed
+    parsing of a response always agree. It may either be embedded directly in the text or be wrapped in a JSON object,
+    such as `{"suggestions": [...]}`. A text without a complete list raises a :class:`JSONExtractionError`.
+    """
+    parser = IncrementalJSONListParser()
+    parser.feed(text)
+    if not parser.complete:
+        msg = "No complete JSON list found"
         raise JSONExtractionError(msg)
-    return "".join(buffer)
+    return parser.items
 
 
 def split_book_title_by_author(answer: str) -> tuple[str, str]:
@@ -68,11 +142,53 @@ def split_title_years(answer: str) -> tuple[str, list[str]]:
     return (answer, [])
 
 
-def extract_all_answers(solutions: list) -> list[tuple[str, tuple[str, ...]]]:
-    """Extract all answers from a list of solutions."""
-    result = []
-    for thread in solutions:
-        for result_list in thread["results"]:
-            for entry in result_list:
-                result.append((entry["title"], tuple(entry["qualifiers"])))
-    return result
+def normalise_title_year_entry(entry: dict) -> None:
+    """Set the `title` and `qualifiers` of a generated games or movies entry from its `answer`.
+
+    The answer is either a `{"title": ..., "year": ...}` object or a `title (year)` string.
+    """
+    if isinstance(entry["answer"], dict) and "title" in entry["answer"]:
+        entry["title"] = entry["answer"]["title"]
+        if "year" in entry["answer"] and entry["answer"]["year"] is not None:
+            entry["qualifiers"] = [entry["answer"]["year"]]
+        else:
+            entry["qualifiers"] = []
+    elif isinstance(entry["answer"], str):
+        title, years = split_title_years(entry["answer"])
+        entry["title"] = title
+        entry["qualifiers"] = years
+
+
+def file_digest(path: str) -> str:
+    """Calculate the SHA-256 hex digest of a file's content."""
+    with open(path, "rb") as in_f:
+        return hashlib.file_digest(in_f, "sha256").hexdigest()
+
+
+class TokenBucket:
+    """Asynchronous token-bucket rate limiter.
+
+    Tokens are refilled at `rate` tokens per second, up to `capacity` tokens. A `rate` of 0 disables rate limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        """Initialise the rate limiter with a full bucket."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Wait until `tokens` tokens are available and take them from the bucket."""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens = self._tokens - tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
@@ -0,0 +1,31 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the lookup response cache."""
+
+import pytest
+
+from llm_complex_leisure_search.cache import CacheMissError, ResponseCache
+
+
+def test_offline_replay(tmp_path):
+    """Test that an offline cache replays stored responses and fails on misses without fetching."""
+    path = str(tmp_path / "cache.sqlite")
+    online = ResponseCache(path, ttl=0, max_size=0)
+    assert online.cached("igdb.search", "Half-Life", lambda: [{"id": 1, "name": "Half-Life"}]) == [
+        {"id": 1, "name": "Half-Life"}
+    ]
+    online.close()
+
+    def fetch() -> None:
+        pytest.fail("The offline cache must not fetch responses")
+
+    offline = ResponseCache(path, ttl=0, max_size=0, offline=True)
+    try:
+        assert offline.cached("igdb.search", "  half-life ", fetch) == [{"id": 1, "name": "Half-Life"}]
+        with pytest.raises(CacheMissError):
+            offline.cached("igdb.search", "Portal", fetch)
+        with pytest.raises(CacheMissError):
+            offline.cached("themoviedb.search", "Half-Life", fetch)
+    finally:
+        offline.close()
@@ -0,0 +1,47 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the result journal."""
+
+import json
+import os
+
+from llm_complex_leisure_search.llms.journal import ResultJournal
+
+
+def test_resume_partial_results(tmp_path):
+    """Test that re-queried threads replace their partial results instead of being added a second time."""
+    path = str(tmp_path / "stub_jdoc.json")
+    with open(path, "w") as out_f:
+        json.dump(
+            [
+                {"thread_id": "t1", "results": [[{"title": "old"}]]},
+                {"thread_id": "t2", "results": [[{"title": "A"}], [{"title": "B"}], [{"title": "C"}]]},
+            ],
+            out_f,
+        )
+    with ResultJournal(path) as journal:
+        assert journal.completed(3) == {"t2"}
+        journal.append({"thread_id": "t1", "results": [[{"title": "new"}]] * 3})
+        journal.append({"thread_id": "t3", "results": [[{"title": "D"}]]})
+        assert journal.completed(3) == {"t1", "t2"}
+    assert not os.path.exists(str(tmp_path / "stub_jdoc.jsonl"))
+    with open(path) as in_f:
+        results = json.load(in_f)
+    assert [result["thread_id"] for result in results] == ["t1", "t2", "t3"]
+    assert results[0]["results"] == [[{"title": "new"}]] * 3
+
+
+def test_resume_interrupted_journal(tmp_path):
+    """Test that a journal left over from an interrupted run is merged by thread_id."""
+    path = str(tmp_path / "stub_jdoc.json")
+    with open(path, "w") as out_f:
+        json.dump([{"thread_id": "t1", "results": [[{"title": "old"}]]}], out_f)
+    with open(str(tmp_path / "stub_jdoc.jsonl"), "w") as out_f:
+        out_f.write(json.dumps({"thread_id": "t1", "results": [[{"title": "new"}]] * 3}) + "\n")
+        out_f.write('{"thread_id": "t2", "res')
+    with ResultJournal(path) as journal:
+        assert journal.completed(3) == {"t1"}
+    with open(path) as in_f:
+        results = json.load(in_f)
+    assert results == [{"thread_id": "t1", "results": [[{"title": "new"}]] * 3}]
@@ -0,0 +1,63 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for querying an LLM backend through the stub server."""
+
+import json
+from http.server import ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+from llm_complex_leisure_search.llms.backends import Backend
+from llm_complex_leisure_search.llms.journal import ResultJournal
+from llm_complex_leisure_search.llms.openai import OpenAISession
+from llm_complex_leisure_search.llms.stub import SUGGESTION_COUNT, StubHandler
+from llm_complex_leisure_search.query import _store_result, query_backend
+from llm_complex_leisure_search.settings import settings
+
+
+@pytest.fixture
+def stub_server(monkeypatch: pytest.MonkeyPatch):
+    """Run the stub server on a free port and point the OpenAI settings at it."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings.openai, "base_url", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.usefixtures("stub_server")
+def test_query_stub_backend(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    """Test that querying the stub backend stores normalised results for all solved threads."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data" / "movies").mkdir(parents=True)
+    tasks = [
+        {"thread_id": thread_id, "prompt": f"Identify the movie {thread_id}", "title": "Title", "years": []}
+        for thread_id in ("t1", "t2")
+    ]
+    with open(tmp_path / "data" / "movies" / "solved_jdoc.json", "w") as out_f:
+        json.dump(tasks, out_f)
+    backend = Backend("Stub", "stub", OpenAISession(), 2, 0)
+
+    query_backend("movies", backend, ["jdoc"])
+
+    with open(tmp_path / "data" / "movies" / "stub_jdoc.json") as in_f:
+        results = json.load(in_f)
+    assert sorted(thread["thread_id"] for thread in results) == ["t1", "t2"]
+    for thread in results:
+        assert len(thread["results"]) == settings.llm.retest_target
+        for attempt in thread["results"]:
+            assert len(attempt) == SUGGESTION_COUNT
+            assert attempt[0]["title"].startswith("Stub answer")
+            assert len(attempt[0]["qualifiers"]) == 1
+
+
+def test_store_malformed_result(tmp_path):
+    """Test that a result with a malformed entry is skipped, while other results are stored."""
+    with ResultJournal(str(tmp_path / "stub_jdoc.json")) as journal:
+        assert not _store_result(journal, "movies", {"thread_id": "t1"}, [[{"title": "No answer"}]])
+        assert _store_result(journal, "movies", {"thread_id": "t2"}, [[{"answer": "Title (1999)"}], None])
+        assert journal.completed(1) == {"t2"}
@@ -0,0 +1,64 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for retrying requests in the query runner."""
+
+import pytest
+
+from llm_complex_leisure_search.llms import LLMSession, TransientLLMError
+from llm_complex_leisure_search.llms.runner import QueryRunner
+from llm_complex_leisure_search.settings import settings
+
+
+class FailingSession(LLMSession):
+    """Session that raises the given error for the first `failures` requests."""
+
+    def __init__(self, error: Exception, failures: int):
+        """Create the session."""
+        self.error = error
+        self.failures = failures
+        self.requests = 0
+
+    def generate_single(self, prompt: str) -> list[dict] | None:  # noqa: ARG002
+        """Raise the error or return a single suggestion."""
+        self.requests = self.requests + 1
+        if self.requests <= self.failures:
+            raise self.error
+        return [{"title": "Title"}]
+
+
+@pytest.fixture(autouse=True)
+def _single_attempt(monkeypatch: pytest.MonkeyPatch):
+    """Make a single attempt per task without any backoff delay."""
+    monkeypatch.setattr(settings.llm, "retest_target", 1)
+    monkeypatch.setattr(settings.llm, "max_attempts", 1)
+    monkeypatch.setattr(settings.llm, "max_retries", 2)
+    monkeypatch.setattr(settings.llm, "retry_backoff", 0)
+
+
+def run_task(session: LLMSession) -> list[list[dict]]:
+    """Run a single task with the session and return its responses."""
+    results = []
+    QueryRunner(session, 1, 0).run([{"prompt": "Prompt"}], lambda _, responses: results.extend(responses), "Test")
+    return results
+
+
+def test_transient_errors_are_retried():
+    """Test that a request failing with a transient error is retried until it succeeds."""
+    session = FailingSession(TransientLLMError("rate limited"), 2)
+    assert run_task(session) == [[{"title": "Title"}]]
+    assert session.requests == 3
+
+
+def test_transient_errors_give_up_after_max_retries():
+    """Test that a request is given up once all retries have failed."""
+    session = FailingSession(TransientLLMError("rate limited"), 5)
+    assert run_task(session) == []
+    assert session.requests == 3
+
+
+def test_other_errors_are_not_retried():
+    """Test that a request failing with a non-transient error fails immediately."""
+    session = FailingSession(KeyError("choices"), 1)
+    assert run_task(session) == []
+    assert session.requests == 1
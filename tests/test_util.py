@@ -0,0 +1,43 @@
+# SPDX-FileCopyrightText: 2024-present Mark Hall <mark.hall@work.room3b.eu>
+#
+# SPDX-License-Identifier: MIT
+"""Tests for the JSON list parsers."""
+
+import pytest
+
+from llm_complex_leisure_search.util import IncrementalJSONListParser, JSONExtractionError, parse_json_list
+
+EDGE_CASES = [
+    ('[{"title": "A"}, {"title": "B"}]', [{"title": "A"}, {"title": "B"}]),
+    ('{"suggestions": [{"title": "A", "qualifiers": ["a]"]}]}', [{"title": "A", "qualifiers": ["a]"]}]),
+    ('Sure! [see below]: [{"title": "A"}]', [{"title": "A"}]),
+    ('text [1, 2] then [{"a": 1}]', [{"a": 1}]),
+    ('broken {"x": [1,2] [{"a": 1}]', [{"a": 1}]),
+    ('{"a": 1} then [{"t": 2}]', [{"t": 2}]),
+    ('```json\n[\n {"title": "x [1]"},\n {"title": "y"}\n]\n```', [{"title": "x [1]"}, {"title": "y"}]),
+    ("[]", []),
+    ('[{"title": "A", "sub": [{"x": 1}]}, {"title": "B"', None),
+    ('{"suggestions": [{"title": "A", "sub": [{"x": 1}]}, {"ti', None),
+    ('[[{"title": "A"}]]', None),
+    ("no list at all", None),
+]
+
+
+def parse_streamed(text: str, chunk_size: int) -> list | None:
+    """Parse the text with the incremental parser in chunks, returning `None` if the list is not complete."""
+    parser = IncrementalJSONListParser()
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start : start + chunk_size])
+    return parser.items if parser.complete else None
+
+
+@pytest.mark.parametrize(("text", "expected"), EDGE_CASES)
+def test_batch_and_streamed_parsers_agree(text: str, expected: list | None):
+    """Test that the batch and the streamed parser return the same list or both fail."""
+    if expected is None:
+        with pytest.raises(JSONExtractionError):
+            parse_json_list(text)
+    else:
+        assert parse_json_list(text) == expected
+    for chunk_size in (1, 2, 5, len(text)):
+        assert parse_streamed(text, chunk_size) == expected